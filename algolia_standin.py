@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Local HTTP stand-in for the parts of the Algolia REST API the scripts use.
+
+Objects and settings live in memory. Latency and transient failures can be
+injected so the uploader's concurrency and retry paths can be exercised:
+
+    python algolia_standin.py --port 8089 --fail-rate 0.1 --latency-ms 20
+    python generate_dataset.py --host http://127.0.0.1:8089
+
+Search requests (POST /1/indexes/{name}/query and the multi-query
+/1/indexes/*/queries) are answered by local_search.LocalIndex, rebuilt
+lazily after writes. --catalog preloads records so load_test.py can run
+without an upload first:
+
+    python algolia_standin.py --catalog /tmp/items.json
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote
+
+INDEX_ROUTE = re.compile(r"^/1/indexes/([^/]+)/(batch|settings|query)$")
+QUERIES_ROUTE = "/1/indexes/*/queries"
+SEARCH_PARAMS = ("query", "facetFilters", "numericFilters", "hitsPerPage", "page", "attributesToRetrieve")
+
+
+def search_params(request):
+    """Search kwargs from a request: inline JSON fields and/or an URL-encoded params string."""
+    params = {k: v for k, v in request.items() if k in SEARCH_PARAMS}
+    for key, value in parse_qsl(request.get("params") or ""):
+        if key not in SEARCH_PARAMS:
+            continue
+        if key in ("hitsPerPage", "page"):
+            value = int(value)
+        elif key != "query" and value.startswith("["):
+            value = json.loads(value)
+        params[key] = value
+    return params
+
+
+class StandinState:
+    def __init__(self, fail_rate=0.0, latency_ms=0):
+        self.fail_rate = fail_rate
+        self.latency_ms = latency_ms
+        self.indexes = {}
+        self.settings = {}
+        self.requests = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.searches = 0
+        self.task_id = 0
+        self.lock = threading.Lock()
+        self._search_indexes = {}
+
+    def next_task(self):
+        self.task_id += 1
+        return self.task_id
+
+    def search_index(self, index_name):
+        """LocalIndex over the current objects; call with the lock held."""
+        cached = self._search_indexes.get(index_name)
+        if cached is None:
+            # Imported here: only search traffic needs numpy.
+            from local_search import LocalIndex
+
+            records = list(self.indexes.get(index_name, {}).values())
+            cached = self._search_indexes[index_name] = LocalIndex(records, self.settings.get(index_name))
+        return cached
+
+    def search(self, index_name, request):
+        with self.lock:
+            index = self.search_index(index_name)
+            self.searches += 1
+        result = index.search(**search_params(request))
+        result["index"] = index_name
+        return result
+
+    def load(self, index_name, records):
+        with self.lock:
+            objects = self.indexes.setdefault(index_name, {})
+            for record in records:
+                objects[record["objectID"]] = record
+            self._search_indexes.pop(index_name, None)
+        return len(objects)
+
+    def apply_batch(self, index_name, requests):
+        self._search_indexes.pop(index_name, None)
+        objects = self.indexes.setdefault(index_name, {})
+        object_ids = []
+        for req in requests:
+            action = req.get("action")
+            body = req.get("body") or {}
+            oid = body.get("objectID")
+            if action in ("addObject", "updateObject"):
+                objects[oid] = body
+            elif action in ("partialUpdateObject", "partialUpdateObjectNoCreate"):
+                if oid in objects:
+                    objects[oid].update(body)
+                elif action == "partialUpdateObject":
+                    objects[oid] = body
+            elif action == "deleteObject":
+                objects.pop(oid, None)
+            elif action == "clear":
+                objects.clear()
+            else:
+                raise ValueError(f"unsupported batch action {action!r}")
+            object_ids.append(oid)
+        return object_ids
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "searches": self.searches,
+            "indexes": {name: len(objs) for name, objs in self.indexes.items()},
+        }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients stall ~40ms on every response waiting for a delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with self.server.state.lock:
+            self.server.state.bytes_in += len(raw)
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else {}
+
+    def _handle(self, method):
+        state = self.server.state
+        # Always drain the body so keep-alive connections stay in sync.
+        try:
+            payload = self._read_json() if method in ("POST", "PUT") else None
+        except ValueError as e:
+            return self._reply(400, {"message": f"invalid JSON: {e}", "status": 400})
+        if self.path == "/_standin/stats" and method == "GET":
+            with state.lock:
+                return self._reply(200, state.stats())
+
+        if state.latency_ms:
+            time.sleep(state.latency_ms / 1000)
+        with state.lock:
+            state.requests += 1
+            if state.fail_rate and random.random() < state.fail_rate:
+                state.failures += 1
+                return self._reply(503, {"message": "injected failure", "status": 503})
+
+        route = self.path.split("?", 1)[0]
+        if route == QUERIES_ROUTE and method == "POST":
+            requests = payload.get("requests", [])
+            return self._reply(200, {"results": [state.search(r.get("indexName"), r) for r in requests]})
+        m = INDEX_ROUTE.match(route)
+        if not m:
+            return self._reply(404, {"message": f"no route for {method} {self.path}", "status": 404})
+        index_name, resource = unquote(m.group(1)), m.group(2)
+        if resource == "query" and method == "POST":
+            return self._reply(200, state.search(index_name, payload))
+
+        with state.lock:
+            if resource == "batch" and method == "POST":
+                try:
+                    object_ids = state.apply_batch(index_name, payload.get("requests", []))
+                except ValueError as e:
+                    return self._reply(400, {"message": str(e), "status": 400})
+                return self._reply(200, {"taskID": state.next_task(), "objectIDs": object_ids})
+            if resource == "settings" and method == "PUT":
+                state.settings[index_name] = payload
+                state._search_indexes.pop(index_name, None)
+                return self._reply(200, {"taskID": state.next_task(), "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
+            if resource == "settings" and method == "GET":
+                return self._reply(200, state.settings.get(index_name, {}))
+        return self._reply(405, {"message": f"{method} not allowed on {resource}", "status": 405})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+
+def make_server(host="127.0.0.1", port=0, fail_rate=0.0, latency_ms=0):
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(fail_rate, latency_ms)
+    return server
+
+
+def serve(host="127.0.0.1", port=0, fail_rate=0.0, latency_ms=0):
+    """Start the stand-in on a daemon thread; returns (server, base_url)."""
+    server = make_server(host, port, fail_rate, latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fraction of requests answered with HTTP 503")
+    parser.add_argument("--latency-ms", type=int, default=0,
+                        help="delay added to every request")
+    parser.add_argument("--catalog", metavar="PATH",
+                        help="preload records from items.json, NDJSON or a columnar file")
+    parser.add_argument("--index", default="healthforge_items", help="index --catalog loads into")
+    args = parser.parse_args()
+
+    httpd = make_server(args.host, args.port, args.fail_rate, args.latency_ms)
+    if args.catalog:
+        from sinks import iter_catalog
+
+        n = httpd.state.load(args.index, iter_catalog(args.catalog))
+        httpd.state.search_index(args.index)
+        print(f"Loaded {n} records into '{args.index}'")
+    # load_test.py waits for this line before it starts sending traffic.
+    print(f"Algolia stand-in listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n  Final stats:", json.dumps(httpd.state.stats()))
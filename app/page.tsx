@@ -20,6 +20,11 @@ function safeString(val: string | undefined | null, fallback = ''): string {
   return typeof val === 'string' ? val : fallback
 }
 
+// Needs are compared the way generate_dataset.py normalizes provides_equipment.
+function equipmentKey(val: string | undefined | null): string {
+  return safeString(val).trim().toLowerCase()
+}
+
 function safeNumber(val: number | undefined | null, fallback = 0): number {
   return typeof val === 'number' && !isNaN(val) ? val : fallback
 }
@@ -75,6 +80,7 @@ interface WellnessItem {
   rating: number
   compatibility_tags: string[]
   price_range_usd: number
+  provides_equipment?: string[]
 }
 
 interface UserProfile {
@@ -454,16 +460,24 @@ export default function Home() {
         }
       })
 
-      // Equipment overlap check
+      // Equipment overlap check: gear records list the exercise equipment
+      // they satisfy in provides_equipment, so each need is a set lookup.
       const allEquipment = kitItems
         .filter((i) => safeString(i.category) === 'exercise')
         .flatMap((i) => safeArray(i.equipment))
-      const exerciseNeeds = [...new Set(allEquipment)].filter(Boolean)
-      const gearProvided = kitItems
-        .filter((i) => safeString(i.category) === 'gear')
-        .map((i) => safeString(i.name).toLowerCase())
-      for (const need of exerciseNeeds) {
-        if (!gearProvided.some((g) => g.includes(need.toLowerCase()))) {
+      const exerciseNeeds = new Map<string, string>()
+      for (const need of allEquipment) {
+        const key = equipmentKey(need)
+        if (key && !exerciseNeeds.has(key)) exerciseNeeds.set(key, need)
+      }
+      const gearProvided = new Set(
+        kitItems
+          .filter((i) => safeString(i.category) === 'gear')
+          .flatMap((i) => safeArray(i.provides_equipment))
+          .map(equipmentKey)
+      )
+      for (const [key, need] of Array.from(exerciseNeeds)) {
+        if (!gearProvided.has(key)) {
           newAlerts.push(`Your exercises need "${need}" — consider adding matching gear to your kit`)
         }
       }
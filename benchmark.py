@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Benchmarks for the dataset pipeline, with a regression check.
+
+For every catalog size it measures:
+
+  * generate_all_items and each build_*_record builder (records/s),
+  * JSON serialization and parsing of the catalog (MB/s),
+  * upload_to_algolia against a local algolia_standin server (records/s),
+  * per-kit latency (p50/p99) of the four-category retrieval plus filtering,
+    through build_kit over LocalIndex and through KitCatalog.
+
+Results are written as JSON; `compare` lists metrics that got worse by more
+than the threshold and exits non-zero when there are any:
+
+    python benchmark.py run --sizes 1000,20000 --out /tmp/bench-base.json
+    python benchmark.py run --sizes 1000,20000 --out /tmp/bench-new.json
+    python benchmark.py compare /tmp/bench-base.json /tmp/bench-new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import algolia_standin
+import generate_dataset
+from index_config import INDEX_NAME
+from metrics import percentile
+
+SUITES = ["generate", "builders", "json", "upload", "kits"]
+DEFAULT_SIZES = [1_000, 20_000]
+DEFAULT_KITS = 300
+DEFAULT_THRESHOLD = 0.10
+BENCH_SEED = 0
+
+BUILDERS = [
+    ("exercise", generate_dataset.build_exercise_record, generate_dataset.EXERCISES),
+    ("supplement", generate_dataset.build_supplement_record, generate_dataset.SUPPLEMENTS),
+    ("gear", generate_dataset.build_gear_record, generate_dataset.GEAR),
+    ("meal_plan", generate_dataset.build_meal_plan_record, generate_dataset.MEAL_PLANS),
+    ("extra", generate_dataset.build_extra_record, generate_dataset.WELLNESS_EXTRAS),
+]
+
+
+def best_of(fn, repeat):
+    """Run `fn` `repeat` times; return (fastest wall time, last result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def bench_generate(size, items, repeat):
+    elapsed, _ = best_of(lambda: generate_dataset.generate_all_items(count=size, seed=BENCH_SEED), repeat)
+    return {"generate.records_per_s": metric(len(items) / elapsed, "records/s", "higher")}
+
+
+def bench_builders(size, items, repeat):
+    results = {}
+    for name, builder, source in BUILDERS:
+        def run():
+            rng = random.Random(BENCH_SEED)
+            for i in range(size):
+                builder(source[i % len(source)], i, rng)
+        elapsed, _ = best_of(run, repeat)
+        results[f"builder.{name}.records_per_s"] = metric(size / elapsed, "records/s", "higher")
+    return results
+
+
+def bench_json(size, items, repeat):
+    dump_s, text = best_of(lambda: json.dumps(items, indent=2), repeat)
+    load_s, _ = best_of(lambda: json.loads(text), repeat)
+    ndjson_s, _ = best_of(lambda: "\n".join(json.dumps(r, separators=(",", ":")) for r in items), repeat)
+    mb = len(text.encode()) / 1e6
+    return {
+        "json.dump_mb_per_s": metric(mb / dump_s, "MB/s", "higher"),
+        "json.load_mb_per_s": metric(mb / load_s, "MB/s", "higher"),
+        "json.ndjson_records_per_s": metric(len(items) / ndjson_s, "records/s", "higher"),
+        "json.size_mb": metric(mb, "MB", "lower"),
+    }
+
+
+def bench_upload(size, items, repeat):
+    server, url = algolia_standin.serve()
+    try:
+        # upload_to_algolia reports through print; keep the benchmark output clean.
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, _ = best_of(lambda: generate_dataset.upload_to_algolia(items, host=url), repeat)
+        stats = server.state.stats()
+    finally:
+        server.shutdown()
+        server.server_close()
+    if stats["indexes"].get(INDEX_NAME) != len(items):
+        raise RuntimeError(f"stand-in holds {stats['indexes'].get(INDEX_NAME)} records, expected {len(items)}")
+    return {
+        "upload.records_per_s": metric(len(items) / elapsed, "records/s", "higher"),
+        "upload.mb_per_s": metric(stats["bytes_in"] / repeat / 1e6 / elapsed, "MB/s", "higher"),
+    }
+
+
+def bench_kits(size, items, repeat, kits=DEFAULT_KITS):
+    # numpy-backed modules are imported here so the other suites run without them.
+    from kit_builder import KitCatalog, build_kit, random_profile
+    from local_search import LocalIndex, multi_search
+
+    rng = random.Random(BENCH_SEED)
+    profiles = [random_profile(rng) for _ in range(kits)]
+
+    index_s, index = best_of(lambda: LocalIndex(items), 1)
+    catalog_s, catalog = best_of(lambda: KitCatalog(items), 1)
+    indexes = {INDEX_NAME: index}
+
+    def search(requests):
+        return multi_search(indexes, requests)
+
+    results = {
+        "kits.local.index_build_s": metric(index_s, "s", "lower"),
+        "kits.columnar.catalog_build_s": metric(catalog_s, "s", "lower"),
+    }
+    for name, build in (("local", lambda p: build_kit(search, p)),
+                        ("columnar", lambda p: catalog.build_kits([p])[0])):
+        # Warm the caches once, then keep the fastest pass per profile.
+        latencies = [None] * len(profiles)
+        for _ in range(repeat + 1):
+            for i, profile in enumerate(profiles):
+                t0 = time.perf_counter()
+                build(profile)
+                elapsed = time.perf_counter() - t0
+                if latencies[i] is None or elapsed < latencies[i]:
+                    latencies[i] = elapsed
+        latencies.sort()
+        results[f"kits.{name}.p50_ms"] = metric(percentile(latencies, 50) * 1000, "ms", "lower")
+        results[f"kits.{name}.p99_ms"] = metric(percentile(latencies, 99) * 1000, "ms", "lower")
+
+    batch_s, _ = best_of(lambda: catalog.build_kits(profiles), repeat)
+    results["kits.columnar.batch_kits_per_s"] = metric(len(profiles) / batch_s, "kits/s", "higher")
+    return results
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run(sizes, suites, repeat, kits, log=print):
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "suites": suites,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        log(f"Catalog size {size}:")
+        items = generate_dataset.generate_all_items(count=size, seed=BENCH_SEED)
+        results = report["results"][str(size)] = {}
+        for suite in suites:
+            t0 = time.perf_counter()
+            if suite == "kits":
+                measured = bench_kits(size, items, repeat, kits)
+            else:
+                measured = globals()[f"bench_{suite}"](size, items, repeat)
+            results.update(measured)
+            log(f"  {suite} ({time.perf_counter() - t0:.1f}s)")
+            for name, m in measured.items():
+                log(f"    {name:<36} {m['value']:>12.4g} {m['unit']}")
+    return report
+
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD):
+    """Return (rows, regressions); a row is (size, name, base, new, change, status)."""
+    rows, regressions = [], []
+    for size, metrics in new["results"].items():
+        for name, m in metrics.items():
+            old = base["results"].get(size, {}).get(name)
+            if old is None or not old["value"]:
+                continue
+            change = (m["value"] - old["value"]) / old["value"]
+            worse = -change if m["better"] == "higher" else change
+            status = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+            row = (size, name, old["value"], m["value"], change, status)
+            rows.append(row)
+            if status == "REGRESSION":
+                regressions.append(row)
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run the benchmarks and write a JSON report")
+    run_parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                            help="comma-separated catalog sizes (default: %(default)s)")
+    run_parser.add_argument("--suites", default=",".join(SUITES),
+                            help="comma-separated subset of: %(default)s")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest is kept")
+    run_parser.add_argument("--kits", type=int, default=DEFAULT_KITS, help="profiles timed by the kits suite")
+    run_parser.add_argument("--out", default="/tmp/healthforge_bench.json")
+    cmp_parser = sub.add_parser("compare", help="flag regressions between two reports")
+    cmp_parser.add_argument("base")
+    cmp_parser.add_argument("new")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="relative change counted as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        suites = args.suites.split(",")
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+        report = run([int(s) for s in args.sizes.split(",")], suites, args.repeat, args.kits)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.out}")
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        rows, regressions = compare(base, new, args.threshold)
+        print(f"{'size':>8}  {'metric':<36} {'base':>12} {'new':>12} {'change':>8}")
+        for size, name, old, value, change, status in rows:
+            print(f"{size:>8}  {name:<36} {old:>12.4g} {value:>12.4g} {change:>+8.1%}  {status}")
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,239 @@
+"""Concurrent, retrying bulk uploader for the Algolia indexing REST API.
+
+Records are packed into batches by serialized byte size, a bounded number of
+batches are kept in flight on a thread pool, and each batch is retried with
+jittered exponential backoff. Point `host` at algolia_standin.py to exercise
+the whole pipeline without touching the real index.
+"""
+
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import quote, urlsplit
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_BATCH_BYTES = 1_000_000
+DEFAULT_RETRIES = 5
+DEFAULT_TIMEOUT = 30
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 10.0
+
+# 429 and 5xx are worth another attempt; any other 4xx is a bad request.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=None, retryable=True):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def algolia_host(app_id):
+    return f"https://{app_id}.algolia.net"
+
+
+class Transport:
+    """Keep-alive JSON client, one persistent connection per worker thread."""
+
+    def __init__(self, host, app_id, api_key, timeout=DEFAULT_TIMEOUT, compress=False):
+        parts = urlsplit(host)
+        self.scheme = parts.scheme or "https"
+        self.netloc = parts.netloc or parts.path
+        self.headers = {
+            "X-Algolia-Application-Id": app_id,
+            "X-Algolia-API-Key": api_key,
+            "Content-Type": "application/json; charset=UTF-8",
+        }
+        self.timeout = timeout
+        self.compress = compress
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            conn = cls(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def request(self, method, path, body=None):
+        headers = dict(self.headers)
+        if body is not None and self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        try:
+            conn = self._connection()
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+        except (OSError, http.client.HTTPException) as e:
+            self._reset()
+            raise UploadError(f"{method} {path}: {e}") from e
+        if resp.status >= 300:
+            retryable = resp.status in RETRYABLE_STATUS
+            raise UploadError(
+                f"{method} {path}: HTTP {resp.status} {payload[:200]!r}",
+                status=resp.status, retryable=retryable,
+            )
+        if not payload:
+            return {}
+        try:
+            return json.loads(payload)
+        except ValueError as e:
+            # A 2xx that is not JSON (proxy page, truncated body): fail this
+            # request rather than the whole upload.
+            raise UploadError(f"{method} {path}: unreadable response {payload[:200]!r}",
+                              status=resp.status, retryable=False) from e
+
+
+def index_path(index_name, suffix=""):
+    return f"/1/indexes/{quote(index_name, safe='')}{suffix}"
+
+
+def encode_request(record, action="addObject"):
+    return json.dumps({"action": action, "body": record}, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def iter_batches(entries, max_bytes=DEFAULT_MAX_BATCH_BYTES):
+    # `entries` are pre-encoded batch request entries. A single entry larger
+    # than the budget is still sent, alone, so nothing is silently dropped.
+    batch, size = [], 0
+    for entry in entries:
+        if batch and size + len(entry) + 1 > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(entry)
+        size += len(entry) + 1
+    if batch:
+        yield batch
+
+
+def batch_body(batch):
+    return b'{"requests":[' + b",".join(batch) + b"]}"
+
+
+def backoff_delay(attempt):
+    # "Full jitter": uniform over an exponentially growing, capped window.
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def send_with_retry(transport, method, path, body, retries=DEFAULT_RETRIES, on_retry=None):
+    attempt = 0
+    while True:
+        try:
+            return transport.request(method, path, body)
+        except UploadError as e:
+            if not e.retryable or attempt >= retries:
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+
+
+def bulk_upload(transport, index_name, records, action="addObject", **kwargs):
+    return bulk_send(transport, index_name, ((action, r) for r in records), **kwargs)
+
+
+def bulk_send(transport, index_name, operations, concurrency=DEFAULT_CONCURRENCY,
+              max_batch_bytes=DEFAULT_MAX_BATCH_BYTES, retries=DEFAULT_RETRIES, log=print, metrics=None):
+    """Send `operations`, an iterable of (action, body) pairs, and return a summary dict.
+
+    At most `concurrency` batches are in flight, so memory is bounded by
+    concurrency * max_batch_bytes even for generator input. A metrics.Metrics
+    registry, if given, gets an upload_batch stage and latency histogram.
+    """
+    if log is None:
+        log = lambda msg: None  # noqa: E731
+    path = index_path(index_name, "/batch")
+    stats = {
+        "records": 0, "batches": 0, "bytes": 0, "retries": 0,
+        "failed_batches": 0, "failed_records": 0, "errors": [],
+    }
+    lock = threading.Lock()
+
+    def on_retry(err):
+        with lock:
+            stats["retries"] += 1
+        if metrics is not None:
+            metrics.count("upload_retries")
+
+    def send(batch):
+        body = batch_body(batch)
+        start = time.perf_counter()
+        try:
+            send_with_retry(transport, "POST", path, body, retries, on_retry)
+        finally:
+            if metrics is not None:
+                metrics.observe("upload_batch_seconds", time.perf_counter() - start)
+        if metrics is not None:
+            metrics.add_stage("upload_batch", time.perf_counter() - start, len(batch), len(body))
+        return len(body)
+
+    def collect(done):
+        for future in done:
+            batch_no, n_records = in_flight.pop(future)
+            try:
+                n_bytes = future.result()
+            except UploadError as e:
+                stats["failed_batches"] += 1
+                stats["failed_records"] += n_records
+                stats["errors"].append(f"batch {batch_no}: {e}")
+                if metrics is not None:
+                    metrics.count("upload_failed_batches")
+                log(f"  Batch {batch_no} failed: {e}")
+                continue
+            stats["records"] += n_records
+            stats["bytes"] += n_bytes
+            log(f"  Uploaded batch {batch_no} ({n_records} records, {n_bytes} bytes)")
+
+    start = time.perf_counter()
+    in_flight = {}
+    entries = (encode_request(body, action) for action, body in operations)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for batch in iter_batches(entries, max_batch_bytes):
+            if len(in_flight) >= concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            stats["batches"] += 1
+            in_flight[pool.submit(send, batch)] = (stats["batches"], len(batch))
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed_s"] = round(elapsed, 3)
+    stats["records_per_s"] = round(stats["records"] / elapsed, 1) if elapsed else 0.0
+    stats["bytes_per_s"] = round(stats["bytes"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def set_settings(transport, index_name, settings, retries=DEFAULT_RETRIES, metrics=None):
+    body = json.dumps(settings, separators=(",", ":")).encode()
+    if metrics is None:
+        return send_with_retry(transport, "PUT", index_path(index_name, "/settings"), body, retries)
+    with metrics.stage("set_settings", nbytes=len(body)):
+        return send_with_retry(transport, "PUT", index_path(index_name, "/settings"), body, retries)
+
+
+def format_summary(stats):
+    line = (
+        f"  {stats['records']} records in {stats['batches']} batches, "
+        f"{stats['bytes'] / 1e6:.2f} MB in {stats['elapsed_s']:.2f}s "
+        f"({stats['records_per_s']:.0f} records/s, {stats['bytes_per_s'] / 1e6:.2f} MB/s), "
+        f"{stats['retries']} retries"
+    )
+    if stats["failed_batches"]:
+        line += f", {stats['failed_batches']} failed batches ({stats['failed_records']} records)"
+    return line
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""Compact columnar binary catalog format (.hfc) alongside items.json.
+
+Layout: an 8-byte magic, a little-endian uint64 header length, a JSON
+header, then 64-byte aligned little-endian arrays. Column types are
+inferred from the records:
+
+  * bool / int / float  ->  one typed array (ints narrowed to the smallest
+    dtype that fits: rating, price_range_usd, duration_minutes, ...)
+  * str                 ->  dictionary codes, or offsets + UTF-8 blob once
+    the dictionary grows past DICT_LIMIT (objectID, name, description)
+  * list of str         ->  row offsets + dictionary codes (goals,
+    allergens, equipment, compatibility_tags, ...)
+  * anything else       ->  offsets + JSON text (macros)
+
+A column that mixes types is promoted (int -> float, otherwise -> JSON); a
+float column that also held ints keeps a uint8 mask of those rows, so they
+come back as ints. Ints a float64 or int64 column cannot hold exactly are
+stored as JSON.
+
+Every record also carries a shape code: the ordered tuple of keys it has,
+so records round-trip with the same keys in the same order and absent
+attributes need no null masks.
+
+ColumnarCatalog memory-maps the file; column() returns zero-copy NumPy
+views, and opening a multi-million-record file only parses the header.
+
+    python columnar.py export /tmp/items.json /tmp/items.hfc
+    python columnar.py info /tmp/items.hfc
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import time
+from array import array
+
+import numpy as np
+
+MAGIC = b"HFCOL\x00\x01\x00"
+ALIGN = 64
+DICT_LIMIT = 65536
+MAX_EXACT_INT = 2 ** 53  # larger ints would not survive a float64 column; they go to JSON
+INT64_RANGE = range(-2 ** 63, 2 ** 63)  # ints outside an int64 column go to JSON
+
+
+def _restore_ints(values, ints):
+    # Float columns that also held ints give those rows back as ints.
+    if ints is None:
+        return values
+    return [int(v) if is_int else v for v, is_int in zip(values, ints)]
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _kind(value):
+    if isinstance(value, bool):
+        return "bool"
+    if _is_int(value):
+        return "int" if value in INT64_RANGE else "json"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return "strlist"
+    return "json"
+
+
+class _ColumnBuilder:
+    """Accumulates one attribute; rows without it hold a placeholder."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.values = self.codes = self.offsets = self.blob = self.dictionary = None
+        self.ints = None  # float columns: 1 where the row held an int, created on the first one
+        if kind in ("bool", "int", "float"):
+            self.values = array({"bool": "B", "int": "q", "float": "d"}[kind])
+        elif kind == "str":
+            self.dictionary = {}
+            self.codes = array("I")
+        elif kind == "strlist":
+            self.dictionary = {}
+            self.codes = array("I")
+            self.offsets = array("q", [0])
+        else:
+            self.blob = bytearray()
+            self.offsets = array("q", [0])
+
+    def pad(self, rows):
+        missing = rows - self.rows
+        if missing <= 0:
+            return
+        if self.values is not None:
+            self.values.extend(bytes(missing) if self.kind == "bool" else [0] * missing)
+            if self.ints is not None:
+                self.ints.extend(bytes(missing))
+        elif self.kind == "str":
+            self.codes.extend([0] * missing)
+        else:
+            self.offsets.extend([self.offsets[-1]] * missing)
+        self.rows = rows
+
+    def _accepts(self, value):
+        kind, t = self.kind, type(value)
+        if kind in ("str", "text"):
+            return t is str
+        if kind == "strlist":
+            return t is list and all(type(v) is str for v in value)
+        if kind == "float":
+            return t is float or (t is int and abs(value) <= MAX_EXACT_INT)
+        if kind == "int":
+            return t is int and value in INT64_RANGE
+        if kind == "bool":
+            return t is bool
+        return True
+
+    def _promote(self, value):
+        if self.kind == "int" and _kind(value) == "float" \
+                and all(abs(v) <= MAX_EXACT_INT for v in self.values):
+            self.kind, self.values = "float", array("d", self.values)
+            self.ints = array("B", bytes([1]) * self.rows)
+            return
+        # Anything else the typed layouts cannot hold falls back to JSON text.
+        values = self.decode()
+        self.__init__("json")
+        for v in values:
+            self.append(v)
+
+    def _to_text(self):
+        # Dictionary too large to pay off: switch to offsets + blob.
+        lookup = [s.encode() for s in self.dictionary]
+        blob = bytearray()
+        offsets = array("q", [0])
+        for code in self.codes:
+            blob += lookup[code]
+            offsets.append(len(blob))
+        self.kind, self.blob, self.offsets = "text", blob, offsets
+        self.codes = self.dictionary = None
+
+    def decode(self):
+        if self.kind == "bool":
+            return [bool(v) for v in self.values]
+        if self.kind == "int":
+            return list(self.values)
+        if self.kind == "float":
+            return _restore_ints(list(self.values), self.ints)
+        if self.kind == "str":
+            lookup = list(self.dictionary)
+            return [lookup[c] for c in self.codes]
+        bounds = list(zip(self.offsets, self.offsets[1:]))
+        if self.kind == "text":
+            return [self.blob[a:b].decode() for a, b in bounds]
+        if self.kind == "strlist":
+            lookup = list(self.dictionary)
+            return [[lookup[c] for c in self.codes[a:b]] for a, b in bounds]
+        return [json.loads(self.blob[a:b]) if b > a else None for a, b in bounds]
+
+    def append(self, value):
+        if not self._accepts(value):
+            self._promote(value)
+        kind = self.kind
+        self.rows += 1
+        if kind == "bool" or kind == "int":
+            self.values.append(value)
+        elif kind == "float":
+            self.values.append(float(value))
+            if type(value) is int and self.ints is None:
+                self.ints = array("B", bytes(self.rows - 1))
+            if self.ints is not None:
+                self.ints.append(type(value) is int)
+        elif kind == "str":
+            code = self.dictionary.setdefault(value, len(self.dictionary))
+            self.codes.append(code)
+            if code >= DICT_LIMIT:
+                self._to_text()
+        elif kind == "text":
+            self.blob += value.encode()
+            self.offsets.append(len(self.blob))
+        elif kind == "strlist":
+            dictionary = self.dictionary
+            self.codes.extend([dictionary.setdefault(v, len(dictionary)) for v in value])
+            self.offsets.append(len(self.codes))
+        else:
+            if value is not None:
+                self.blob += json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+            self.offsets.append(len(self.blob))
+
+    def arrays(self):
+        if self.kind == "bool":
+            return {"values": np.frombuffer(self.values, dtype=np.uint8)}
+        if self.kind == "float":
+            out = {"values": np.frombuffer(self.values, dtype=np.float64)}
+            if self.ints is not None:
+                out["ints"] = np.frombuffer(self.ints, dtype=np.uint8)
+            return out
+        if self.kind == "int":
+            values = np.frombuffer(self.values, dtype=np.int64)
+            for dtype in (np.int8, np.int16, np.int32):
+                info = np.iinfo(dtype)
+                if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+                    return {"values": values.astype(dtype)}
+            return {"values": values}
+        if self.kind == "str":
+            codes = np.frombuffer(self.codes, dtype=np.uint32)
+            return {"codes": codes.astype(np.uint8 if len(self.dictionary) <= 256 else np.uint16)}
+        if self.kind == "strlist":
+            codes = np.frombuffer(self.codes, dtype=np.uint32)
+            return {
+                "offsets": np.frombuffer(self.offsets, dtype=np.int64),
+                "codes": codes.astype(np.uint8 if len(self.dictionary) <= 256 else np.uint16)
+                if len(self.dictionary) <= DICT_LIMIT else codes,
+            }
+        return {"offsets": np.frombuffer(self.offsets, dtype=np.int64), "blob": np.frombuffer(bytes(self.blob), dtype=np.uint8)}
+
+
+class ColumnarWriter:
+    """Push-style writer: write() records one at a time, close() writes the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.n = 0
+        self._columns = {}
+        self._shapes = {}
+        self._shape_codes = array("H")
+
+    def write(self, record):
+        n = self.n
+        self._shape_codes.append(self._shapes.setdefault(tuple(record), len(self._shapes)))
+        columns = self._columns
+        for key, value in record.items():
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = _ColumnBuilder(_kind(value))
+            column.pad(n)
+            column.append(value)
+        self.n = n + 1
+
+    def close(self):
+        """Write the file; returns the record count."""
+        n = self.n
+        for column in self._columns.values():
+            column.pad(n)
+
+        header = {"version": 1, "n": n, "shapes": [list(s) for s in self._shapes], "columns": []}
+        payload = [("shape", "codes", np.frombuffer(self._shape_codes, dtype=np.uint16))]
+        for name, column in self._columns.items():
+            entry = {"name": name, "type": column.kind}
+            if column.dictionary is not None:
+                entry["dictionary"] = list(column.dictionary)
+            header["columns"].append(entry)
+            for part, arr in column.arrays().items():
+                payload.append((name, part, arr))
+
+        # Array offsets are relative to the aligned start of the data section.
+        layout, offset = [], 0
+        for name, part, arr in payload:
+            layout.append({"column": name, "part": part, "dtype": arr.dtype.str, "length": len(arr), "offset": offset})
+            offset += -(-arr.nbytes // ALIGN) * ALIGN
+        header["arrays"] = layout
+
+        head = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode()
+        data_start = -(-(len(MAGIC) + 8 + len(head)) // ALIGN) * ALIGN
+        with open(self.path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(head)))
+            f.write(head)
+            f.write(bytes(data_start - f.tell()))
+            for (_, _, arr), entry in zip(payload, layout):
+                f.write(bytes(data_start + entry["offset"] - f.tell()))
+                f.write(arr.astype(arr.dtype.newbyteorder("<"), copy=False).tobytes())
+            f.write(bytes(data_start + offset - f.tell()))
+        return n
+
+
+def write_columnar(records, path):
+    """Write any iterable of records in one pass; returns the record count."""
+    writer = ColumnarWriter(path)
+    for record in records:
+        writer.write(record)
+    return writer.close()
+
+
+def is_columnar(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class ColumnarCatalog:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a columnar catalog")
+        (head_len,) = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        head_end = len(MAGIC) + 8 + head_len
+        header = json.loads(self._mm[len(MAGIC) + 8:head_end])
+        data_start = -(-head_end // ALIGN) * ALIGN
+
+        self.n = header["n"]
+        self.shapes = [tuple(s) for s in header["shapes"]]
+        self.types = {c["name"]: c["type"] for c in header["columns"]}
+        self.dictionaries = {c["name"]: c["dictionary"] for c in header["columns"] if "dictionary" in c}
+        self._arrays = {}
+        for entry in header["arrays"]:
+            self._arrays[entry["column"], entry["part"]] = np.frombuffer(
+                self._mm, dtype=np.dtype(entry["dtype"]), count=entry["length"],
+                offset=data_start + entry["offset"],
+            )
+
+    def close(self):
+        self._arrays.clear()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # views handed out by column() still alive; freed with them
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def columns(self):
+        return list(self.types)
+
+    @property
+    def shape_codes(self):
+        return self._arrays["shape", "codes"]
+
+    def column(self, name):
+        """Zero-copy views: values, codes, or (offsets, codes|blob) depending on the type."""
+        kind = self.types[name]
+        if kind in ("bool", "int", "float"):
+            return self._arrays[name, "values"]
+        if kind == "str":
+            return self._arrays[name, "codes"]
+        if kind == "strlist":
+            return self._arrays[name, "offsets"], self._arrays[name, "codes"]
+        return self._arrays[name, "offsets"], self._arrays[name, "blob"]
+
+    def has(self, name):
+        # Rows whose shape includes `name`.
+        present = np.array([name in s for s in self.shapes], dtype=bool)
+        return present[self.shape_codes]
+
+    def to_pylist(self, name):
+        kind = self.types[name]
+        if kind == "bool":
+            return self.column(name).astype(bool).tolist()
+        if kind == "int":
+            return self.column(name).tolist()
+        if kind == "float":
+            ints = self._arrays.get((name, "ints"))
+            return _restore_ints(self.column(name).tolist(), None if ints is None else ints.tolist())
+        if kind == "str":
+            lookup = np.array(self.dictionaries[name], dtype=object)
+            return lookup[self.column(name)].tolist()
+        offsets, data = self.column(name)
+        bounds = offsets.tolist()
+        if kind == "strlist":
+            lookup = np.array(self.dictionaries[name] or [None], dtype=object)
+            flat = lookup[data].tolist()
+            return [flat[a:b] for a, b in zip(bounds, bounds[1:])]
+        raw = data.tobytes()
+        if kind == "text":
+            return [raw[a:b].decode() for a, b in zip(bounds, bounds[1:])]
+        return [json.loads(raw[a:b]) if b > a else None for a, b in zip(bounds, bounds[1:])]
+
+    def records(self):
+        """Materialize every record as a dict, keys in their original order."""
+        values = {name: self.to_pylist(name) for name in self.types}
+        out = [None] * self.n
+        codes = self.shape_codes
+        for code, keys in enumerate(self.shapes):
+            rows = np.flatnonzero(codes == code).tolist()
+            if len(self.shapes) > 1:
+                columns = [[values[key][i] for i in rows] for key in keys]
+            else:
+                columns = [values[key] for key in keys]
+            for i, row in zip(rows, zip(*columns)):
+                out[i] = dict(zip(keys, row))
+        return out
+
+    def record(self, i):
+        out = {}
+        for key in self.shapes[self.shape_codes[i]]:
+            kind = self.types[key]
+            if kind in ("bool", "int", "float"):
+                v = self.column(key)[i].item()
+                if kind == "bool":
+                    v = bool(v)
+                elif kind == "float" and (key, "ints") in self._arrays and self._arrays[key, "ints"][i]:
+                    v = int(v)
+                out[key] = v
+            elif kind == "str":
+                out[key] = self.dictionaries[key][self.column(key)[i]]
+            else:
+                offsets, data = self.column(key)
+                a, b = int(offsets[i]), int(offsets[i + 1])
+                if kind == "strlist":
+                    out[key] = [self.dictionaries[key][c] for c in data[a:b].tolist()]
+                elif kind == "text":
+                    out[key] = data[a:b].tobytes().decode()
+                else:
+                    out[key] = json.loads(data[a:b].tobytes()) if b > a else None
+        return out
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self._arrays.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="convert items.json / NDJSON to the columnar format")
+    export.add_argument("source")
+    export.add_argument("dest")
+    info = sub.add_parser("info", help="describe a columnar file")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from sinks import iter_catalog
+
+        n = write_columnar(iter_catalog(args.source), args.dest)
+        print(f"Wrote {n} records to {args.dest}")
+    else:
+        t0 = time.perf_counter()
+        with ColumnarCatalog(args.path) as catalog:
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"{catalog.n} records, {catalog.nbytes() / 1e6:.1f} MB of arrays, opened in {elapsed:.2f}ms")
+            for name, kind in catalog.types.items():
+                extra = f" ({len(catalog.dictionaries[name])} distinct)" if name in catalog.dictionaries else ""
+                print(f"  {name:<22} {kind}{extra}")
@@ -0,0 +1,196 @@
+"""Generation-time dedup: objectID collision safety and near-duplicate suppression.
+
+Two checks run over the record stream, in order:
+
+  * near duplicates: a record is reduced to a set of attribute:word features
+    (objectID and rating left out, list order ignored). An exact repeat of
+    an earlier kept feature set is dropped at once. Otherwise its MinHash
+    signature is compared with the kept records of the same category and
+    name. If the estimated Jaccard similarity reaches the threshold, the
+    record is dropped.
+  * objectID collisions: kept IDs go into a Bloom filter sized for the
+    expected record count. A hit means the 12-hex-char ID may already be
+    taken, so the record is re-keyed deterministically instead of silently
+    overwriting the earlier object. A false positive only re-keys a record
+    that did not need it.
+
+Memory is bounded: the Bloom filter is fixed-size, at most `max_tracked`
+content keys are remembered, and at most MAX_PER_BUCKET signatures per name.
+"""
+
+import hashlib
+import math
+import random
+import re
+from array import array
+
+NUM_PERM = 32
+MERSENNE = (1 << 61) - 1
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_EXPECTED = 1_000_000
+DEFAULT_ERROR_RATE = 1e-6
+DEFAULT_MAX_TRACKED = 200_000
+MAX_PER_BUCKET = 64
+FEATURE_CACHE = 100_000
+IGNORED_ATTRIBUTES = {"objectID", "rating"}
+
+_rng = random.Random(0x5EED)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE), _rng.randrange(MERSENNE)) for _ in range(NUM_PERM)]
+WORD_RE = re.compile(r"\w+")
+
+
+class BloomFilter:
+    def __init__(self, capacity=DEFAULT_EXPECTED, error_rate=DEFAULT_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from one 128-bit digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """Add `key`; returns True if it was (probably) present already."""
+        present = True
+        for pos in self._positions(key):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & bit:
+                present = False
+                self.bits[byte] |= bit
+        return present
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _words(value):
+    return WORD_RE.findall(str(value).lower())
+
+
+def _value_features(attr, value):
+    if isinstance(value, (list, tuple)):
+        return frozenset(f"{attr}:{w}" for item in value for w in _words(item))
+    if isinstance(value, dict):
+        return frozenset(f"{attr}.{k}={v}" for k, v in value.items())
+    if isinstance(value, (bool, int, float)) or value is None:
+        return frozenset([f"{attr}={value}"])
+    return frozenset(f"{attr}:{w}" for w in _words(value))
+
+
+def content_features(record, cache=None):
+    """The record as a set of attribute:word features, for Jaccard comparison."""
+    features = set()
+    for attr, value in record.items():
+        if attr in IGNORED_ATTRIBUTES:
+            continue
+        if cache is None or isinstance(value, dict):
+            features |= _value_features(attr, value)
+            continue
+        # Attribute values repeat across a generated catalog, so their
+        # features are computed once per distinct value.
+        key = (attr, tuple(value) if isinstance(value, list) else value)
+        part = cache.get(key)
+        if part is None:
+            part = _value_features(attr, value)
+            if len(cache) < FEATURE_CACHE:
+                cache[key] = part
+        features |= part
+    return features
+
+
+def permuted(feature):
+    h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+    return tuple((a * h + b) % MERSENNE for a, b in PERMUTATIONS)
+
+
+def minhash(features, cache=None):
+    # The feature vocabulary is small and repeats across records, so each
+    # feature's permuted hashes are computed once and cached.
+    if not features:
+        return array("Q", [0] * NUM_PERM)
+    rows = []
+    for feature in features:
+        row = cache.get(feature) if cache is not None else None
+        if row is None:
+            row = permuted(feature)
+            if cache is not None and len(cache) < FEATURE_CACHE:
+                cache[feature] = row
+        rows.append(row)
+    return array("Q", map(min, zip(*rows)))
+
+
+def similarity(a, b):
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def rekey(object_id, attempt):
+    return hashlib.md5(f"{object_id}~{attempt}".encode()).hexdigest()[:len(object_id) or 12]
+
+
+class Deduplicator:
+    """filter() yields the records to keep; `stats` counts what was removed."""
+
+    def __init__(self, near=True, threshold=DEFAULT_THRESHOLD, expected=DEFAULT_EXPECTED,
+                 error_rate=DEFAULT_ERROR_RATE, max_tracked=DEFAULT_MAX_TRACKED):
+        self.near = near
+        self.threshold = threshold
+        self.max_tracked = max_tracked
+        self.ids = BloomFilter(expected, error_rate)
+        self._contents = {}  # content key -> the stats counter a repeat of it goes to
+        self._values = {}
+        self._features = {}
+        self._buckets = {}
+        self._tracked = 0
+        self.stats = {"records": 0, "kept": 0, "exact_duplicates": 0, "near_duplicates": 0, "ids_reassigned": 0}
+
+    def _is_duplicate(self, record):
+        features = content_features(record, self._values)
+        key = hashlib.blake2b("\x1f".join(sorted(features)).encode(), digest_size=16).digest()
+        counter = self._contents.get(key)
+        if counter is not None:
+            self.stats[counter] += 1
+            return True
+        signature = minhash(features, self._features)
+        bucket_key = (record.get("category"), " ".join(_words(record.get("name", ""))))
+        bucket = self._buckets.get(bucket_key)
+        duplicate = bucket is not None and any(similarity(signature, kept) >= self.threshold for kept in bucket)
+        if self._tracked < self.max_tracked:
+            # Kept content repeats exactly; dropped content stays a near duplicate.
+            self._contents[key] = "near_duplicates" if duplicate else "exact_duplicates"
+            self._tracked += 1
+            if not duplicate:
+                if bucket is None:
+                    bucket = self._buckets[bucket_key] = []
+                if len(bucket) < MAX_PER_BUCKET:
+                    bucket.append(signature)
+        if duplicate:
+            self.stats["near_duplicates"] += 1
+        return duplicate
+
+    def filter(self, records):
+        stats = self.stats
+        for record in records:
+            stats["records"] += 1
+            if self.near and self._is_duplicate(record):
+                continue
+            oid = record.get("objectID")
+            if oid is not None and self.ids.add(oid):
+                attempt = 1
+                while self.ids.add(rekey(oid, attempt)):
+                    attempt += 1
+                record = dict(record, objectID=rekey(oid, attempt))
+                stats["ids_reassigned"] += 1
+            stats["kept"] += 1
+            yield record
+
+
+def format_stats(stats):
+    return (
+        f"  Dedup: {stats['records']} records in, {stats['kept']} kept; dropped "
+        f"{stats['exact_duplicates']} exact and {stats['near_duplicates']} near duplicates, "
+        f"re-keyed {stats['ids_reassigned']} colliding objectIDs"
+    )
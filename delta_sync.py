@@ -0,0 +1,240 @@
+"""Incremental index sync driven by a local content-hash manifest.
+
+The manifest is a SQLite file recording, per objectID, a hash of the whole
+record plus a hash per attribute, the hash of the last settings payload that
+was applied, and the host and index it describes. A sync diffs freshly
+generated records against it and sends only:
+
+  * addObject for new objectIDs,
+  * partialUpdateObject with just the changed attributes when the record
+    keeps the same attribute set, updateObject when attributes come or go,
+  * deleteObject for objectIDs that are no longer generated,
+
+and skips set_settings when the settings hash is unchanged. Old entries are
+looked up one objectID at a time and the new manifest is written to a side
+file as records stream past, so memory stays flat for any catalog size. The
+side file replaces the manifest only after a fully successful sync, and a
+manifest made for another host or index is refused.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+import bulk_upload
+
+MANIFEST_VERSION = 2
+WRITE_BATCH = 5000
+DIGEST_SIZE = 8
+
+
+def _digest(value):
+    data = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(data.encode(), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def record_hashes(record):
+    attrs = {k: _digest(v) for k, v in record.items() if k != "objectID"}
+    return _digest(attrs), attrs
+
+
+def settings_hash(settings):
+    return _digest(settings)
+
+
+def catalog_hash(records):
+    # Order-independent: the same records in any order hash the same.
+    digest = hashlib.blake2b(digest_size=16)
+    for oid, full in sorted((r["objectID"], record_hashes(r)[0]) for r in records):
+        digest.update(f"{oid}:{full};".encode())
+    return digest.hexdigest()
+
+
+def sync_target(transport, index_name):
+    return f"{transport.scheme}://{transport.netloc}/{index_name}"
+
+
+class ManifestError(ValueError):
+    pass
+
+
+class Manifest:
+    """Previous sync state, read lazily; empty when the file does not exist yet."""
+
+    def __init__(self, path, target):
+        self.path = path
+        self.settings_hash = None
+        self._db = None
+        self._shapes = {}
+        if not os.path.exists(path):
+            return
+        try:
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            meta = dict(db.execute("SELECT name, value FROM meta"))
+            self._shapes = {i: json.loads(keys) for i, keys in db.execute("SELECT id, keys FROM shapes")}
+        except sqlite3.DatabaseError as e:
+            raise ManifestError(f"{path}: not a version {MANIFEST_VERSION} manifest ({e}); "
+                                "remove it to resend everything") from e
+        if meta.get("version") != str(MANIFEST_VERSION):
+            db.close()
+            raise ManifestError(f"{path}: unsupported manifest version {meta.get('version')!r}")
+        if meta.get("target") != target:
+            db.close()
+            raise ManifestError(f"{path} tracks {meta.get('target')}, not {target}; "
+                                "use another --manifest for this index")
+        self._db = db
+        self.settings_hash = meta.get("settings_hash")
+
+    def get(self, oid):
+        """Return (full hash, {attribute: hash}) for `oid`, or None."""
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT full, shape, attrs FROM objects WHERE object_id = ?", (oid,)).fetchone()
+        if row is None:
+            return None
+        full, shape, attrs = row
+        n = DIGEST_SIZE
+        return full.hex(), {k: attrs[i * n:(i + 1) * n].hex() for i, k in enumerate(self._shapes[shape])}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class ManifestWriter:
+    """Builds the next manifest in `path`.tmp; commit() swaps it into place."""
+
+    def __init__(self, path, target):
+        self.path = path
+        self.target = target
+        self.tmp = f"{path}.tmp"
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+        self._db = sqlite3.connect(self.tmp)
+        self._db.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE shapes (id INTEGER PRIMARY KEY, keys TEXT);
+            CREATE TABLE objects (object_id TEXT PRIMARY KEY, full BLOB, shape INTEGER, attrs BLOB) WITHOUT ROWID;
+        """)
+        self._shapes = {}
+        self._rows = []
+
+    def add(self, oid, full, attrs):
+        keys = tuple(attrs)
+        shape = self._shapes.get(keys)
+        if shape is None:
+            shape = self._shapes[keys] = len(self._shapes)
+            self._db.execute("INSERT INTO shapes VALUES (?, ?)", (shape, json.dumps(keys)))
+        # Hashes are stored as raw bytes, attribute hashes concatenated in shape order.
+        self._rows.append((oid, bytes.fromhex(full), shape, bytes.fromhex("".join(attrs.values()))))
+        if len(self._rows) >= WRITE_BATCH:
+            self._flush()
+
+    def _flush(self):
+        self._db.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)", self._rows)
+        self._rows.clear()
+
+    def removed(self, old_path):
+        """objectIDs in the manifest at `old_path` that were not added here."""
+        self._flush()
+        self._db.commit()  # ATTACH/DETACH cannot run inside the open write transaction
+        if not os.path.exists(old_path):
+            return
+        self._db.execute("ATTACH DATABASE ? AS old", (old_path,))
+        cursor = self._db.execute(
+            "SELECT object_id FROM old.objects WHERE object_id NOT IN (SELECT object_id FROM main.objects)")
+        try:
+            for (oid,) in cursor:
+                yield oid
+        finally:
+            cursor.close()
+            self._db.execute("DETACH DATABASE old")
+
+    def commit(self, settings_digest):
+        self._flush()
+        self._db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", str(MANIFEST_VERSION)), ("target", self.target), ("settings_hash", settings_digest),
+        ])
+        self._db.commit()
+        self._db.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self._db.close()
+        os.remove(self.tmp)
+
+
+def iter_changes(records, old, new, counts):
+    """Yield (action, body) operations and record every object in `new` as a side effect."""
+    for record in records:
+        oid = record["objectID"]
+        full, attrs = record_hashes(record)
+        new.add(oid, full, attrs)
+        prev = old.get(oid)
+        if prev is None:
+            counts["added"] += 1
+            yield "addObject", record
+        elif prev[0] == full:
+            counts["unchanged"] += 1
+        elif prev[1].keys() == attrs.keys():
+            counts["updated"] += 1
+            body = {k: record[k] for k, h in attrs.items() if prev[1][k] != h}
+            body["objectID"] = oid
+            yield "partialUpdateObject", body
+        else:
+            counts["replaced"] += 1
+            yield "updateObject", record
+
+    for oid in new.removed(old.path):
+        counts["deleted"] += 1
+        yield "deleteObject", {"objectID": oid}
+
+
+def sync(transport, index_name, records, settings, manifest_path, log=print, **upload_kwargs):
+    target = sync_target(transport, index_name)
+    old = Manifest(manifest_path, target)
+    new = ManifestWriter(manifest_path, target)
+    counts = {"added": 0, "updated": 0, "replaced": 0, "deleted": 0, "unchanged": 0}
+    try:
+        operations = iter_changes(records, old, new, counts)
+        stats = bulk_upload.bulk_send(transport, index_name, operations, log=log, **upload_kwargs)
+        stats.update(counts)
+
+        new_settings_hash = settings_hash(settings)
+        stats["settings_updated"] = new_settings_hash != old.settings_hash
+        stats["settings_failed"] = False
+        if stats["settings_updated"]:
+            try:
+                bulk_upload.set_settings(transport, index_name, settings, metrics=upload_kwargs.get("metrics"))
+            except bulk_upload.UploadError as e:
+                stats["errors"].append(f"settings: {e}")
+                stats["settings_updated"], stats["settings_failed"] = False, True
+    except BaseException:
+        old.close()
+        new.abort()
+        raise
+    old.close()
+
+    if stats["failed_batches"] or stats["settings_failed"]:
+        # Keep the previous manifest: the next sync re-diffs against it and
+        # resends whatever did not make it this time.
+        new.abort()
+        stats["manifest_saved"] = False
+    else:
+        new.commit(new_settings_hash)
+        stats["manifest_saved"] = True
+    return stats
+
+
+def format_counts(stats):
+    return (
+        f"  {stats['added']} added, {stats['updated']} partially updated, "
+        f"{stats['replaced']} replaced, {stats['deleted']} deleted, "
+        f"{stats['unchanged']} unchanged; settings "
+        + ("update failed" if stats.get("settings_failed")
+           else "updated" if stats["settings_updated"] else "unchanged, skipped")
+    )
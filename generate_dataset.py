@@ -1,14 +1,48 @@
 #!/usr/bin/env python3
-"""Generate HealthForge wellness dataset and upload to Algolia."""
-
+"""Generate HealthForge wellness dataset and upload to Algolia.
+
+Commands (records stream once through every selected sink, see sinks.py):
+
+    generate  write records to --out sinks (default json:/tmp/items.json)
+    export    convert an existing catalog file to other formats
+    upload    push records to the index (generated, or --from FILE)
+    sync      push only what changed since the last sync
+    verify    check records and sanity-search them in a local index
+
+    python generate_dataset.py generate --count 100000 --out ndjson:/tmp/items.ndjson --out columnar:/tmp/items.hfc
+    python generate_dataset.py upload --host http://127.0.0.1:8089 --out json:/tmp/items.json
+    python generate_dataset.py export /tmp/items.json --out stdout
+
+Run with no command for the original flow: write /tmp/items.json and upload.
+
+Records can pass through dedup.py before any sink sees them (--dedup).
+Generated records bound for the index (upload, sync) get objectID
+collision checks by default, so a truncated-hash collision is re-keyed
+instead of overwriting another object. --dedup near also drops near
+duplicates (same name, near-identical content), which shrinks a scaled
+catalog far below --count. Files read with --from are never rewritten
+unless asked. The removed counts are logged and reported as metrics
+counters.
+"""
+
+import argparse
+import atexit
+import functools
 import json
 import random
 import hashlib
-from algoliasearch.search.client import SearchClientSync
+import os
+import re
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from dedup import DEFAULT_EXPECTED, DEFAULT_THRESHOLD, Deduplicator, format_stats
+from index_config import ADMIN_KEY, APP_ID, INDEX_NAME, INDEX_SETTINGS
+from metrics import Metrics, profiled, timed
 
-APP_ID = "RM2LBYLLID"
-ADMIN_KEY = "ec65c46d881642b155f86c16b817d716"
-INDEX_NAME = "healthforge_items"
+MANIFEST_PATH = "/tmp/healthforge_manifest.sqlite"
+SYNC_SEED = 0
 
 # --- EXERCISES ---
 EXERCISES = [
@@ -110,6 +144,20 @@ MEAL_PLANS = [
     {"name": "Senior Vitality Plan", "subcategory": "general health", "calories_daily": 1800, "protein_g": 90, "carbs_g": 200, "fat_g": 70, "meals_per_day": 3, "allergens": [], "diet_type": "omnivore"},
 ]
 
+# --- WELLNESS EXTRAS ---
+WELLNESS_EXTRAS = [
+    {"name": "5-Minute Breathing Exercise", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "mindfulness"]},
+    {"name": "Gratitude Journaling", "category": "exercise", "subcategory": "recovery", "goals": ["mindfulness", "better sleep"]},
+    {"name": "Progressive Muscle Relaxation", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "better sleep"]},
+    {"name": "Walking Meditation", "category": "exercise", "subcategory": "recovery", "goals": ["mindfulness", "stress relief"]},
+    {"name": "Body Scan Meditation", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "mindfulness", "better sleep"]},
+    {"name": "Power Nap Protocol", "category": "exercise", "subcategory": "recovery", "goals": ["energy boost", "recovery"]},
+    {"name": "Cold Shower Protocol", "category": "exercise", "subcategory": "recovery", "goals": ["energy boost", "immune support"]},
+    {"name": "Hydration Tracker", "category": "gear", "subcategory": "tech", "goals": ["general fitness", "energy boost"]},
+    {"name": "Posture Corrector Band", "category": "gear", "subcategory": "recovery", "goals": ["injury prevention", "core strength"]},
+    {"name": "Balance Board", "category": "gear", "subcategory": "bodyweight", "goals": ["balance", "core strength", "functional fitness"]},
+]
+
 # --- GOALS ---
 GOALS = [
     "weight loss", "muscle building", "endurance", "flexibility",
@@ -121,17 +169,79 @@ GOALS = [
 WEATHER_CONDITIONS = ["cold", "hot", "mild", "rainy", "any"]
 
 
-def build_exercise_record(ex, idx):
-    oid = hashlib.md5(f"exercise-{ex['name']}-{idx}".encode()).hexdigest()[:12]
+# --- EQUIPMENT INDEX ---
+# Exercise equipment strings are the vocabulary. A gear item provides a need
+# when every normalized word of the need appears in the gear's name or
+# subcategory ("dumbbells" -> "Adjustable Dumbbell Set", "mat" -> "Yoga Mat").
+# Facilities such as "pool access" resolve to no gear and always report a gap.
+
+EQUIPMENT_INDEX_PATH = "/tmp/equipment_index.json"
+
+
+def equipment_words(text):
+    text = re.sub(r"\([^)]*\)", " ", text.lower())
+    words = set()
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word.endswith("ies") and len(word) > 4:
+            word = word[:-3] + "y"
+        elif word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+            word = word[:-1]
+        words.add(word)
+    return frozenset(words)
+
+
+def equipment_vocabulary():
+    return sorted({e.strip().lower() for ex in EXERCISES for e in ex["equipment"] if e.strip()})
+
+
+def gear_provides(gear, vocabulary=None):
+    words = equipment_words(f"{gear['name']} {gear['subcategory']}")
+    return [need for need in vocabulary or equipment_vocabulary() if equipment_words(need) <= words]
+
+
+GEAR_PROVIDES = {gear["name"]: gear_provides(gear)
+                 for gear in GEAR + [e for e in WELLNESS_EXTRAS if e["category"] == "gear"]}
+
+
+def build_equipment_index():
+    vocabulary = equipment_vocabulary()
+    index = {need: [] for need in vocabulary}
+    for gear in GEAR:
+        for need in gear_provides(gear, vocabulary):
+            index[need].append(stable_object_id("gear", gear["name"]))
+    return {
+        "version": 1,
+        "vocabulary": vocabulary,
+        "gear": index,
+        "unresolved": [need for need, oids in index.items() if not oids],
+    }
+
+
+def write_equipment_index(path=EQUIPMENT_INDEX_PATH):
+    index = build_equipment_index()
+    with open(path, "w") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def stable_object_id(prefix, name, occurrence=0):
+    # Derived from the item's identity rather than its position, so IDs
+    # survive reordering and catalog growth; repeated names get an ordinal.
+    key = f"{prefix}-{name}-{occurrence}" if occurrence else f"{prefix}-{name}"
+    return hashlib.md5(key.encode()).hexdigest()[:12]
+
+
+def build_exercise_record(ex, occurrence=0, rng=random):
+    oid = stable_object_id("exercise", ex["name"], occurrence)
     goals = []
     if ex["subcategory"] == "cardio":
-        goals = random.sample(["weight loss", "endurance", "energy boost", "general fitness"], 2)
+        goals = rng.sample(["weight loss", "endurance", "energy boost", "general fitness"], 2)
     elif ex["subcategory"] == "strength":
-        goals = random.sample(["muscle building", "strength", "body composition", "functional fitness"], 2)
+        goals = rng.sample(["muscle building", "strength", "body composition", "functional fitness"], 2)
     elif ex["subcategory"] == "flexibility":
-        goals = random.sample(["flexibility", "stress relief", "injury recovery", "mindfulness"], 2)
+        goals = rng.sample(["flexibility", "stress relief", "injury recovery", "mindfulness"], 2)
     elif ex["subcategory"] == "recovery":
-        goals = random.sample(["stress relief", "better sleep", "injury recovery"], 2)
+        goals = rng.sample(["stress relief", "better sleep", "injury recovery"], 2)
 
     return {
         "objectID": oid,
@@ -139,23 +249,23 @@ def build_exercise_record(ex, idx):
         "category": "exercise",
         "subcategory": ex["subcategory"],
         "difficulty": ex["difficulty"],
-        "duration_minutes": random.choice([15, 20, 30, 45, 60]),
+        "duration_minutes": rng.choice([15, 20, 30, 45, 60]),
         "calories_per_30min": ex["calories_per_30min"],
         "muscle_groups": ex["muscle_groups"],
         "equipment": ex["equipment"],
         "indoor": ex["indoor"],
         "goals": goals,
-        "weather_suitability": ["any"] if ex["indoor"] else random.sample(["mild", "cold", "hot"], 2),
+        "weather_suitability": ["any"] if ex["indoor"] else rng.sample(["mild", "cold", "hot"], 2),
         "description": f"{ex['name']} — a {ex['difficulty']}-level {ex['subcategory']} exercise targeting {', '.join(ex['muscle_groups'])}. Burns approximately {ex['calories_per_30min']} calories per 30 minutes.",
-        "rating": round(random.uniform(3.5, 5.0), 1),
+        "rating": round(rng.uniform(3.5, 5.0), 1),
         "allergens": [],
         "compatibility_tags": [ex["subcategory"], ex["difficulty"]] + ex["muscle_groups"],
         "price_range_usd": 0,
     }
 
 
-def build_supplement_record(sup, idx):
-    oid = hashlib.md5(f"supplement-{sup['name']}-{idx}".encode()).hexdigest()[:12]
+def build_supplement_record(sup, occurrence=0, rng=random):
+    oid = stable_object_id("supplement", sup["name"], occurrence)
     goals = []
     if sup["subcategory"] == "protein":
         goals = ["muscle building", "strength"]
@@ -183,14 +293,14 @@ def build_supplement_record(sup, idx):
         "allergens": sup["allergens"],
         "dosage": sup["dosage"],
         "description": f"{sup['name']} — supports {', '.join(sup['benefits'])}. Recommended dosage: {sup['dosage']}.",
-        "rating": round(random.uniform(3.8, 5.0), 1),
+        "rating": round(rng.uniform(3.8, 5.0), 1),
         "compatibility_tags": [sup["subcategory"]] + sup["benefits"],
         "price_range_usd": sup["price_usd"],
     }
 
 
-def build_gear_record(gear, idx):
-    oid = hashlib.md5(f"gear-{gear['name']}-{idx}".encode()).hexdigest()[:12]
+def build_gear_record(gear, occurrence=0, rng=random):
+    oid = stable_object_id("gear", gear["name"], occurrence)
     return {
         "objectID": oid,
         "name": gear["name"],
@@ -205,15 +315,16 @@ def build_gear_record(gear, idx):
         "goals": gear["for_goals"],
         "weather_suitability": ["any"],
         "description": f"{gear['name']} — essential equipment for {', '.join(gear['for_goals'])}. Durability: {gear['durability']}.",
-        "rating": round(random.uniform(3.5, 5.0), 1),
+        "rating": round(rng.uniform(3.5, 5.0), 1),
         "allergens": [],
         "compatibility_tags": [gear["subcategory"], gear["durability"]] + gear["for_goals"],
         "price_range_usd": gear["price_usd"],
+        "provides_equipment": GEAR_PROVIDES[gear["name"]] if gear["name"] in GEAR_PROVIDES else gear_provides(gear),
     }
 
 
-def build_meal_plan_record(mp, idx):
-    oid = hashlib.md5(f"meal-{mp['name']}-{idx}".encode()).hexdigest()[:12]
+def build_meal_plan_record(mp, occurrence=0, rng=random):
+    oid = stable_object_id("meal", mp["name"], occurrence)
     return {
         "objectID": oid,
         "name": mp["name"],
@@ -228,140 +339,549 @@ def build_meal_plan_record(mp, idx):
         "muscle_groups": [],
         "equipment": [],
         "indoor": True,
-        "goals": [mp["subcategory"]] + random.sample(GOALS, 2),
+        "goals": [mp["subcategory"]] + rng.sample(GOALS, 2),
         "weather_suitability": ["any"],
         "diet_type": mp["diet_type"],
         "allergens": mp["allergens"],
         "description": f"{mp['name']} — {mp['calories_daily']} kcal/day, {mp['protein_g']}g protein, {mp['carbs_g']}g carbs, {mp['fat_g']}g fat. {mp['meals_per_day']} meals per day. Diet type: {mp['diet_type']}.",
-        "rating": round(random.uniform(3.5, 5.0), 1),
+        "rating": round(rng.uniform(3.5, 5.0), 1),
         "compatibility_tags": [mp["subcategory"], mp["diet_type"]],
-        "price_range_usd": random.choice([50, 75, 100, 150]),
+        "price_range_usd": rng.choice([50, 75, 100, 150]),
     }
 
 
-def generate_all_items():
-    records = []
-    idx = 0
-
-    # Add all exercises (some duplicated with variations for volume)
-    for ex in EXERCISES:
-        records.append(build_exercise_record(ex, idx))
-        idx += 1
-
-    # Add exercise variations for volume
-    variations = ["Beginner", "Advanced", "Quick", "Extended", "Morning", "Evening", "Outdoor", "Home"]
-    for ex in random.sample(EXERCISES, 20):
-        variant = random.choice(variations)
-        ex_copy = dict(ex)
-        ex_copy["name"] = f"{variant} {ex['name']}"
-        if variant == "Beginner":
-            ex_copy["difficulty"] = "beginner"
-        elif variant == "Advanced":
-            ex_copy["difficulty"] = "advanced"
-        records.append(build_exercise_record(ex_copy, idx))
-        idx += 1
+VARIATIONS = ["Beginner", "Advanced", "Quick", "Extended", "Morning", "Evening", "Outdoor", "Home"]
+VARIATIONS_PER_SCALE = 20
 
+
+def build_extra_record(extra, occurrence=0, rng=random):
+    oid = stable_object_id("extra", extra["name"], occurrence)
+    record = {
+        "objectID": oid,
+        "name": extra["name"],
+        "category": extra["category"],
+        "subcategory": extra["subcategory"],
+        "difficulty": "beginner",
+        "duration_minutes": rng.choice([5, 10, 15, 20]),
+        "calories_per_30min": rng.randint(0, 100),
+        "muscle_groups": ["mind"] if extra["subcategory"] == "recovery" else ["full body"],
+        "equipment": [],
+        "indoor": True,
+        "goals": extra["goals"],
+        "weather_suitability": ["any"],
+        "description": f"{extra['name']} — supports {', '.join(extra['goals'])}.",
+        "rating": round(rng.uniform(4.0, 5.0), 1),
+        "allergens": [],
+        "compatibility_tags": extra["goals"],
+        "price_range_usd": rng.choice([0, 15, 25, 50]),
+    }
+    if extra["category"] == "gear":
+        # Same shape as build_gear_record, so every gear record carries the facet.
+        record["provides_equipment"] = GEAR_PROVIDES[extra["name"]]
+    return record
+
+
+def build_variation(ex, rng=random):
+    variant = rng.choice(VARIATIONS)
+    ex_copy = dict(ex)
+    ex_copy["name"] = f"{variant} {ex['name']}"
+    if variant == "Beginner":
+        ex_copy["difficulty"] = "beginner"
+    elif variant == "Advanced":
+        ex_copy["difficulty"] = "advanced"
+    return ex_copy
+
+
+def base_item_count():
+    return len(EXERCISES) + len(SUPPLEMENTS) + len(GEAR) + len(MEAL_PLANS) + len(WELLNESS_EXTRAS)
+
+
+def variation_count(scale=1, count=None):
+    # A target record count wins over the scale factor; the fixed catalog is
+    # always emitted, so only the variation step grows or shrinks.
+    if count is not None:
+        return max(0, count - base_item_count())
+    return VARIATIONS_PER_SCALE * scale
+
+
+def iter_variations(n, rng=random):
+    # Sample in rounds so each round draws distinct exercises, as the
+    # original single random.sample(EXERCISES, 20) did.
+    while n > 0:
+        k = min(n, VARIATIONS_PER_SCALE, len(EXERCISES))
+        for ex in rng.sample(EXERCISES, k):
+            yield build_variation(ex, rng)
+        n -= k
+
+
+# --- SHARDED GENERATION ---
+# The record space is cut into shards whose boundaries depend only on the
+# requested size, never on the worker count, and every shard draws from its
+# own Random seeded from (seed, shard key). The fixed catalog gets its own
+# "head"/"tail" shards so its content does not shift when --count changes.
+# Output for a given seed is therefore byte-identical for any --workers.
+
+SHARD_SIZE = 50_000  # variations per shard; a multiple of VARIATIONS_PER_SCALE
+
+
+def derive_seed(seed, key):
+    digest = hashlib.blake2b(f"{seed}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shard_plan(scale=1, count=None):
+    n = variation_count(scale, count)
+    shards = [("head", 0, 0)]
+    shards += [("variations", start, min(start + SHARD_SIZE, n)) for start in range(0, n, SHARD_SIZE)]
+    shards.append(("tail", 0, 0))
+    return shards
+
+
+def shard_builders(timings=None):
+    builders = {
+        "exercise": build_exercise_record,
+        "supplement": build_supplement_record,
+        "gear": build_gear_record,
+        "meal_plan": build_meal_plan_record,
+        "extra": build_extra_record,
+    }
+    if timings is None:
+        return builders
+    return {name: timed(fn, timings, f"builder.{name}") for name, fn in builders.items()}
+
+
+def build_shard(seed, shard, timings=None):
+    kind, start, stop = shard
+    rng = random.Random(derive_seed(seed, f"{kind}-{start}"))
+    seen = Counter()
+    build = shard_builders(timings)
+
+    def occurrence(prefix, name):
+        n = seen[prefix, name]
+        seen[prefix, name] += 1
+        return n
+
+    if kind == "head":
+        # Add all exercises
+        return [build["exercise"](ex, occurrence("exercise", ex["name"]), rng) for ex in EXERCISES]
+
+    if kind == "variations":
+        # Add exercise variations for volume; ordinals are per shard, so
+        # later shards namespace them to keep objectIDs unique.
+        shard_no = start // SHARD_SIZE
+        records = []
+        for ex in iter_variations(stop - start, rng):
+            n = occurrence("exercise", ex["name"])
+            records.append(build["exercise"](ex, f"{shard_no}.{n}" if shard_no else n, rng))
+        return records
+
+    records = []
     # Add all supplements
     for sup in SUPPLEMENTS:
-        records.append(build_supplement_record(sup, idx))
-        idx += 1
-
+        records.append(build["supplement"](sup, occurrence("supplement", sup["name"]), rng))
     # Add all gear
     for gear in GEAR:
-        records.append(build_gear_record(gear, idx))
-        idx += 1
-
+        records.append(build["gear"](gear, occurrence("gear", gear["name"]), rng))
     # Add all meal plans
     for mp in MEAL_PLANS:
-        records.append(build_meal_plan_record(mp, idx))
-        idx += 1
-
+        records.append(build["meal_plan"](mp, occurrence("meal", mp["name"]), rng))
     # Generate additional wellness items for volume
-    wellness_extras = [
-        {"name": "5-Minute Breathing Exercise", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "mindfulness"]},
-        {"name": "Gratitude Journaling", "category": "exercise", "subcategory": "recovery", "goals": ["mindfulness", "better sleep"]},
-        {"name": "Progressive Muscle Relaxation", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "better sleep"]},
-        {"name": "Walking Meditation", "category": "exercise", "subcategory": "recovery", "goals": ["mindfulness", "stress relief"]},
-        {"name": "Body Scan Meditation", "category": "exercise", "subcategory": "recovery", "goals": ["stress relief", "mindfulness", "better sleep"]},
-        {"name": "Power Nap Protocol", "category": "exercise", "subcategory": "recovery", "goals": ["energy boost", "recovery"]},
-        {"name": "Cold Shower Protocol", "category": "exercise", "subcategory": "recovery", "goals": ["energy boost", "immune support"]},
-        {"name": "Hydration Tracker", "category": "gear", "subcategory": "tech", "goals": ["general fitness", "energy boost"]},
-        {"name": "Posture Corrector Band", "category": "gear", "subcategory": "recovery", "goals": ["injury prevention", "core strength"]},
-        {"name": "Balance Board", "category": "gear", "subcategory": "bodyweight", "goals": ["balance", "core strength", "functional fitness"]},
-    ]
-
-    for extra in wellness_extras:
-        oid = hashlib.md5(f"extra-{extra['name']}-{idx}".encode()).hexdigest()[:12]
-        records.append({
-            "objectID": oid,
-            "name": extra["name"],
-            "category": extra["category"],
-            "subcategory": extra["subcategory"],
-            "difficulty": "beginner",
-            "duration_minutes": random.choice([5, 10, 15, 20]),
-            "calories_per_30min": random.randint(0, 100),
-            "muscle_groups": ["mind"] if extra["subcategory"] == "recovery" else ["full body"],
-            "equipment": [],
-            "indoor": True,
-            "goals": extra["goals"],
-            "weather_suitability": ["any"],
-            "description": f"{extra['name']} — supports {', '.join(extra['goals'])}.",
-            "rating": round(random.uniform(4.0, 5.0), 1),
-            "allergens": [],
-            "compatibility_tags": extra["goals"],
-            "price_range_usd": random.choice([0, 15, 25, 50]),
-        })
-        idx += 1
-
+    for extra in WELLNESS_EXTRAS:
+        records.append(build["extra"](extra, occurrence("extra", extra["name"]), rng))
     return records
 
 
-def upload_to_algolia(records):
-    client = SearchClientSync(APP_ID, ADMIN_KEY)
-
-    batch_size = 100
-    for i in range(0, len(records), batch_size):
-        batch = records[i:i + batch_size]
-        client.save_objects(INDEX_NAME, batch)
-        print(f"  Uploaded batch {i // batch_size + 1}/{(len(records) + batch_size - 1) // batch_size}")
-
-    client.set_settings(INDEX_NAME, {
-        "searchableAttributes": [
-            "name", "category", "subcategory", "description",
-            "goals", "muscle_groups", "benefits", "compatibility_tags", "diet_type"
-        ],
-        "attributesForFaceting": [
-            "searchable(category)", "searchable(subcategory)", "searchable(goals)",
-            "searchable(difficulty)", "searchable(muscle_groups)",
-            "searchable(diet_type)", "searchable(allergens)",
-            "indoor", "filterOnly(rating)", "filterOnly(price_range_usd)",
-            "searchable(weather_suitability)", "searchable(equipment)"
-        ],
-        "customRanking": ["desc(rating)"],
-        "attributesToRetrieve": [
-            "name", "category", "subcategory", "difficulty", "duration_minutes",
-            "calories_per_30min", "calories_daily", "macros", "meals_per_day",
-            "muscle_groups", "equipment", "indoor", "goals",
-            "weather_suitability", "benefits", "allergens", "dosage",
-            "diet_type", "description", "rating", "compatibility_tags",
-            "price_range_usd"
-        ],
-        "attributesToHighlight": ["name", "description", "goals", "benefits"],
-        "hitsPerPage": 20,
-    })
-    print("  Index settings configured.")
-    return len(records)
+def build_shard_timed(seed, shard):
+    # Runs in worker processes too, so timings travel back with the records.
+    timings = {}
+    records = build_shard(seed, shard, timings)
+    return records, timings
+
+
+def render_shard(seed, shard):
+    return "".join(
+        json.dumps(r, separators=(",", ":"), ensure_ascii=False) + "\n" for r in build_shard(seed, shard)
+    ).encode()
 
 
-if __name__ == "__main__":
-    print("Generating HealthForge dataset...")
-    items = generate_all_items()
-    print(f"  Generated {len(items)} wellness items")
+def write_shard_file(seed, shard, path):
+    data = render_shard(seed, shard)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def run_shards(fn, seed, shards, workers=1, extra_args=None):
+    """Yield fn(seed, shard, *extra) for each shard, in shard order.
+
+    With workers > 1 the shards run on a process pool; at most 2 * workers
+    results are buffered so memory stays bounded for huge catalogs.
+    """
+    extra_args = extra_args or [()] * len(shards)
+    if workers <= 1:
+        for shard, extra in zip(shards, extra_args):
+            yield fn(seed, shard, *extra)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for shard, extra in zip(shards, extra_args):
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(fn, seed, shard, *extra))
+        while pending:
+            yield pending.popleft().result()
+
+
+def resolve_seed(seed):
+    # An unseeded run still needs one root seed shared by every shard.
+    return seed if seed is not None else random.randrange(2 ** 63)
+
+
+def iter_all_items(scale=1, count=None, seed=None, workers=1, metrics=None):
+    seed = resolve_seed(seed)
+    shards = shard_plan(scale, count)
+    if metrics is None:
+        for records in run_shards(build_shard, seed, shards, workers):
+            yield from records
+        return
+    for records, timings in run_shards(build_shard_timed, seed, shards, workers):
+        metrics.merge_stages(timings)
+        yield from records
+
+
+def generate_all_items(scale=1, count=None, seed=None, workers=1, metrics=None):
+    if metrics is None:
+        return list(iter_all_items(scale, count, seed, workers))
+    with metrics.stage("generate") as stage:
+        items = list(iter_all_items(scale, count, seed, workers, metrics))
+        stage["records"] = len(items)
+    return items
+
+
+def write_ndjson_sharded(path, scale=1, count=None, seed=None, workers=1):
+    # Workers serialize their own shards, so the parent only concatenates bytes.
+    seed = resolve_seed(seed)
+    n = 0
+    with open(path, "wb") as f:
+        for data in run_shards(render_shard, seed, shard_plan(scale, count), workers):
+            f.write(data)
+            n += data.count(b"\n")
+    return n
+
+
+def write_shard_files(directory, scale=1, count=None, seed=None, workers=1):
+    seed = resolve_seed(seed)
+    os.makedirs(directory, exist_ok=True)
+    shards = shard_plan(scale, count)
+    paths = [os.path.join(directory, f"shard-{i:05d}.ndjson") for i in range(len(shards))]
+    total = sum(run_shards(write_shard_file, seed, shards, workers, [(p,) for p in paths]))
+    return paths, total
+
+
+def write_ndjson(records, path):
+    # Compact one-record-per-line output; `records` may be any iterable, so
+    # memory stays flat no matter how many records stream through.
+    n = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def _transport(host, compress):
+    import bulk_upload
+
+    return bulk_upload.Transport(host or bulk_upload.algolia_host(APP_ID), APP_ID, ADMIN_KEY, compress=compress)
+
+
+def _upload_options(concurrency, max_batch_bytes):
+    # None keeps the uploader's own defaults.
+    options = {"concurrency": concurrency, "max_batch_bytes": max_batch_bytes}
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def upload_to_algolia(records, host=None, concurrency=None, max_batch_bytes=None, compress=False,
+                      metrics=None, log=print):
+    # Imported here so generate-only and export-only runs never load the uploader.
+    import bulk_upload
+
+    transport = _transport(host, compress)
+    stats = bulk_upload.bulk_upload(transport, INDEX_NAME, records, log=log, metrics=metrics,
+                                    **_upload_options(concurrency, max_batch_bytes))
+    stats["settings_updated"] = False
+    if not stats["failed_batches"]:
+        try:
+            bulk_upload.set_settings(transport, INDEX_NAME, INDEX_SETTINGS, metrics=metrics)
+            stats["settings_updated"] = True
+        except bulk_upload.UploadError as e:
+            stats["errors"].append(f"settings: {e}")
+    log(bulk_upload.format_summary(stats))
+    for err in stats["errors"]:
+        log(f"  ! {err}")
+    if stats["failed_batches"]:
+        log("  Index settings not updated; rerun the upload once the failed batches go through.")
+    elif stats["settings_updated"]:
+        log("  Index settings configured.")
+    return stats
+
+
+def manifest_path_for(host=None):
+    # One manifest per target, so syncing a stand-in never marks production up to date.
+    if host is None:
+        return MANIFEST_PATH
+    root, ext = os.path.splitext(MANIFEST_PATH)
+    return f"{root}-{hashlib.blake2b(host.encode(), digest_size=4).hexdigest()}{ext}"
+
+
+def sync_to_algolia(records, manifest_path=None, host=None, concurrency=None, max_batch_bytes=None,
+                    compress=False, metrics=None, log=print):
+    import bulk_upload
+    import delta_sync
+
+    manifest_path = manifest_path or manifest_path_for(host)
+    transport = _transport(host, compress)
+    stats = delta_sync.sync(transport, INDEX_NAME, records, INDEX_SETTINGS, manifest_path, log=log,
+                            metrics=metrics, **_upload_options(concurrency, max_batch_bytes))
+    log(delta_sync.format_counts(stats))
+    log(bulk_upload.format_summary(stats))
+    for err in stats["errors"]:
+        log(f"  ! {err}")
+    if not stats["manifest_saved"]:
+        log(f"  Manifest not updated ({manifest_path}); unsent changes will be resent next sync.")
+    return stats
+
+
+DEDUP_MODES = ("near", "ids", "off")
+COMMANDS = ("generate", "export", "upload", "sync", "verify")
+DEFAULT_JSON_PATH = "/tmp/items.json"
+
+
+def verify_index(index, categories):
+    """Sanity searches against a local_search.LocalIndex; returns a list of problems."""
+    problems = []
+    for category, expected in sorted(categories.items()):
+        found = index.search("", [[f"category:{category}"]], hitsPerPage=1)["nbHits"]
+        if found != expected:
+            problems.append(f"category:{category} facet finds {found} records, expected {expected}")
+    vocabulary = set(equipment_vocabulary())
+    for record in index.records:
+        unknown = set(record.get("provides_equipment", [])) - vocabulary
+        if unknown:
+            problems.append(f"{record['objectID']}: provides unknown equipment {sorted(unknown)}")
+    for goal in GOALS:
+        if not index.search(goal, hitsPerPage=1)["nbHits"]:
+            problems.append(f"goal {goal!r} finds no records")
+    return problems
+
+
+def build_parser():
+    generation = argparse.ArgumentParser(add_help=False)
+    generation.add_argument("--scale", type=int, default=1,
+                            help="multiply the exercise variation step (default: 1)")
+    generation.add_argument("--count", type=int,
+                            help="target total record count (overrides --scale)")
+    generation.add_argument("--seed", type=int,
+                            help=f"seed the generator (sync defaults to {SYNC_SEED} so unchanged items hash the same)")
+    generation.add_argument("--workers", type=int, default=1,
+                            help="generate shards on a process pool; output does not depend on this")
+    generation.add_argument("--equipment-index", metavar="PATH",
+                            help=f"also write the equipment -> gear objectID lookup (generate: {EQUIPMENT_INDEX_PATH})")
+
+    dedup = argparse.ArgumentParser(add_help=False)
+    dedup.add_argument("--dedup", choices=DEDUP_MODES,
+                       help="near: drop near duplicates and re-key colliding objectIDs; ids: only re-key; "
+                            "off: pass records through (default: ids for generated upload/sync, else off)")
+    dedup.add_argument("--near-threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="estimated Jaccard similarity at which same-name records count as "
+                            "duplicates (default: %(default)s)")
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument("--from", dest="source", metavar="PATH",
+                        help="read records from items.json, NDJSON or a columnar file instead of generating")
+
+    outputs = argparse.ArgumentParser(add_help=False)
+    outputs.add_argument("--out", action="append", default=[], metavar="SPEC",
+                         help="stream records into SPEC: ndjson:PATH, json:PATH, stdout, columnar:PATH "
+                              "or kits:PATH (repeatable)")
+    outputs.add_argument("--metrics-json", metavar="PATH",
+                         help="write per-stage timings, counters and histograms as JSON on exit")
+    outputs.add_argument("--metrics-prom", metavar="PATH",
+                         help="write the same metrics in Prometheus text format on exit")
+    outputs.add_argument("--profile", metavar="PATH",
+                         help="cProfile the streaming pass and save pstats to PATH (profiles the "
+                              "parent process, so use --workers 1)")
+
+    remote = argparse.ArgumentParser(add_help=False)
+    remote.add_argument("--host", help="indexing API base URL (default: the Algolia app host)")
+    remote.add_argument("--concurrency", type=int, help="batches in flight at once")
+    remote.add_argument("--batch-bytes", type=int, help="serialized byte budget per batch")
+    remote.add_argument("--compress", action="store_true", help="gzip request bodies")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    generate = sub.add_parser("generate", parents=[generation, dedup, outputs], help="generate records into --out sinks")
+    generate.add_argument("--shard-dir", metavar="DIR",
+                          help="write one NDJSON file per shard into DIR instead of --out sinks")
+    export = sub.add_parser("export", parents=[outputs], help="convert an existing catalog file")
+    export.add_argument("source", help="items.json, NDJSON or columnar file")
+    sub.add_parser("upload", parents=[generation, dedup, source, outputs, remote], help="push records to the index")
+    sync = sub.add_parser("sync", parents=[generation, dedup, source, outputs, remote],
+                          help="push only records that changed since the last sync")
+    sync.add_argument("--manifest", help=f"content-hash manifest (default: {MANIFEST_PATH}, or one per --host)")
+    sub.add_parser("verify", parents=[generation, dedup, source, outputs],
+                   help="check records and sanity-search them in a local index")
+    return parser
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["upload", "--out", f"json:{DEFAULT_JSON_PATH}", "--equipment-index", EQUIPMENT_INDEX_PATH, *argv]
+    args = build_parser().parse_args(argv)
+    if args.command == "generate":
+        args.out = args.out or ([] if args.shard_dir else [f"json:{DEFAULT_JSON_PATH}"])
+        args.equipment_index = args.equipment_index or EQUIPMENT_INDEX_PATH
+    if args.command == "export" and not args.out:
+        args.out = ["stdout"]
+    if args.command != "export" and args.dedup is None:
+        # Only guard what is about to be indexed, and never rewrite a user's file unasked.
+        indexing_generated = args.command in ("upload", "sync") and not getattr(args, "source", None)
+        args.dedup = "ids" if indexing_generated else "off"
+
+    # Progress goes to stderr when records go to stdout.
+    to_stdout = any(spec in ("-", "stdout") for spec in args.out)
+    log = functools.partial(print, file=sys.stderr) if to_stdout else print
+
+    run_metrics = Metrics()
+    # Per-record instrumentation (builder timers, per-sink clocks, upload
+    # histograms) costs throughput, so it only runs when someone reads it.
+    detailed = run_metrics if args.metrics_json or args.metrics_prom else None
+    if args.metrics_json:
+        atexit.register(run_metrics.write_json, args.metrics_json)
+    if args.metrics_prom:
+        atexit.register(run_metrics.write_prometheus, args.metrics_prom)
+
+    from sinks import CheckSink, LocalIndexSink, RemoteIndexSink, fan_out, iter_catalog, open_sink
+
+    source = getattr(args, "source", None)
+    if source:
+        log(f"Reading {source}...")
+        records = iter_catalog(source)
+    else:
+        seed = args.seed if args.seed is not None or args.command != "sync" else SYNC_SEED
+        seed = resolve_seed(seed)
+        log("Generating HealthForge dataset...")
+        if args.equipment_index:
+            # Depends only on EXERCISES and GEAR, so it is written up front.
+            equipment = write_equipment_index(args.equipment_index)
+            log(f"  Saved equipment index to {args.equipment_index} "
+                f"({len(equipment['vocabulary']) - len(equipment['unresolved'])}/{len(equipment['vocabulary'])} "
+                "needs covered by gear)")
+        if args.command == "generate" and args.shard_dir:
+            if args.out:
+                raise SystemExit("--shard-dir writes its own files; drop --out")
+            if args.dedup != "off":
+                raise SystemExit("--shard-dir writes shards independently and cannot dedup across them; "
+                                 "use --dedup off")
+            with profiled(args.profile, log=log), run_metrics.stage("write_shards") as stage:
+                paths, size = write_shard_files(args.shard_dir, args.scale, args.count, seed, args.workers)
+                stage["bytes"] = size
+            log(f"  Wrote {len(paths)} shard files ({size} bytes) to {args.shard_dir}")
+            return 0
+        if args.command == "generate" and args.workers > 1 and args.dedup == "off" and len(args.out) == 1 \
+                and args.out[0].startswith("ndjson:"):
+            # Workers serialize their own shards; nothing to fan out.
+            path = args.out[0].partition(":")[2]
+            with profiled(args.profile, log=log), run_metrics.stage("write_ndjson") as stage:
+                n = write_ndjson_sharded(path, args.scale, args.count, seed, args.workers)
+                stage.update(records=n, bytes=os.path.getsize(path))
+            log(f"  Streamed {n} wellness items to {path}")
+            return 0
+        records = iter_all_items(args.scale, args.count, seed, args.workers, detailed)
+    if detailed is not None:
+        # "stream" below also covers dedup and the sinks; this is the producer alone.
+        records = detailed.iterate("read" if source else "generate", records)
+
+    deduper = None
+    if args.command != "export" and args.dedup != "off":
+        # Sizes the objectID Bloom filter; a file's record count is unknown up front.
+        expected = DEFAULT_EXPECTED if source else base_item_count() + variation_count(args.scale, args.count)
+        deduper = Deduplicator(near=args.dedup == "near", threshold=args.near_threshold, expected=expected)
+        records = deduper.filter(records)
+
+    if args.command == "sync":
+        import delta_sync
+
+        args.manifest = args.manifest or manifest_path_for(args.host)
+        target = delta_sync.sync_target(_transport(args.host, args.compress), INDEX_NAME)
+        try:
+            delta_sync.Manifest(args.manifest, target).close()
+        except delta_sync.ManifestError as e:
+            raise SystemExit(str(e))
+
+    sinks = [open_sink(spec, log) for spec in args.out]
+    if args.command in ("upload", "sync"):
+        log("Syncing changes to Algolia..." if args.command == "sync" else "Uploading to Algolia...")
+        remote = dict(host=args.host, concurrency=args.concurrency, max_batch_bytes=args.batch_bytes,
+                      compress=args.compress, metrics=detailed, log=log)
+        if args.command == "sync":
+            send = functools.partial(sync_to_algolia, manifest_path=args.manifest, **remote)
+        else:
+            send = functools.partial(upload_to_algolia, **remote)
+        sinks.append(RemoteIndexSink(send, args.command))
+    if args.command == "verify":
+        check, local = CheckSink(), LocalIndexSink()
+        sinks += [check, local]
+
+    with profiled(args.profile, log=log), run_metrics.stage("stream") as stage:
+        summaries, n = fan_out(records, sinks, detailed)
+        stage["records"] = n
+    if deduper is not None:
+        for counter in ("exact_duplicates", "near_duplicates", "ids_reassigned"):
+            run_metrics.count(f"dedup_{counter}", deduper.stats[counter])
+        log(format_stats(deduper.stats))
+        kept, total = deduper.stats["kept"], deduper.stats["records"]
+        if kept < total // 2:
+            log(f"  ! WARNING: dedup kept only {kept} of {total} records ({kept / total:.1%}); "
+                "--count is not a target under --dedup near, use --dedup ids or off to keep the full catalog")
+    log(f"  Streamed {n} wellness items to {len(sinks)} sink(s)")
+    for sink, summary in summaries.items():
+        if "path" in summary:
+            log(f"  Saved {summary['records']} records to {summary['path']} ({summary['bytes']} bytes)")
+
+    if args.command == "upload":
+        stats = summaries[sinks[-1]]
+        if stats["failed_batches"]:
+            log(f"  Upload incomplete: {stats['failed_records']} records in {stats['failed_batches']} "
+                "batches failed")
+            return 1
+        if not stats["settings_updated"]:
+            log(f"  Upload incomplete: settings for '{INDEX_NAME}' could not be configured")
+            return 1
+        log(f"  Done! {stats['records']} records indexed in '{INDEX_NAME}'")
+        return 0
+    if args.command == "sync":
+        return 0 if summaries[sinks[-1]]["manifest_saved"] else 1
+
+    if args.command == "verify":
+        report = summaries[check]
+        problems = report["examples"] + verify_index(local.index, report["categories"])
+        total = report["problems"] + len(problems) - len(report["examples"])
+        counts = ", ".join(f"{c} {k}" for k, c in sorted(report["categories"].items(), key=str))
+        log(f"  Checked {report['records']} records ({counts})")
+        for problem in problems:
+            log(f"  ! {problem}")
+        log(f"  {total} problem(s)" if total else "  All checks passed.")
+        return 1 if total else 0
+    return 0
 
-    with open("/tmp/items.json", "w") as f:
-        json.dump(items, f, indent=2)
-    print("  Saved to items.json")
 
-    print("Uploading to Algolia...")
-    count = upload_to_algolia(items)
-    print(f"  Done! {count} records indexed in '{INDEX_NAME}'")
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # stdout piped into head and friends: stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -0,0 +1,31 @@
+"""Index identity and settings, shared by every module that builds, mirrors or queries the index."""
+
+APP_ID = "RM2LBYLLID"
+ADMIN_KEY = "ec65c46d881642b155f86c16b817d716"
+INDEX_NAME = "healthforge_items"
+
+INDEX_SETTINGS = {
+    "searchableAttributes": [
+        "name", "category", "subcategory", "description",
+        "goals", "muscle_groups", "benefits", "compatibility_tags", "diet_type"
+    ],
+    "attributesForFaceting": [
+        "searchable(category)", "searchable(subcategory)", "searchable(goals)",
+        "searchable(difficulty)", "searchable(muscle_groups)",
+        "searchable(diet_type)", "searchable(allergens)",
+        "indoor", "filterOnly(rating)", "filterOnly(price_range_usd)",
+        "searchable(weather_suitability)", "searchable(equipment)",
+        "searchable(provides_equipment)"
+    ],
+    "customRanking": ["desc(rating)"],
+    "attributesToRetrieve": [
+        "name", "category", "subcategory", "difficulty", "duration_minutes",
+        "calories_per_30min", "calories_daily", "macros", "meals_per_day",
+        "muscle_groups", "equipment", "indoor", "goals",
+        "weather_suitability", "benefits", "allergens", "dosage",
+        "diet_type", "description", "rating", "compatibility_tags",
+        "price_range_usd", "provides_equipment"
+    ],
+    "attributesToHighlight": ["name", "description", "goals", "benefits"],
+    "hitsPerPage": 20,
+}
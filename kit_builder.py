@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Server-side port of the frontend's buildKit (app/page.tsx).
+
+Two implementations of the same rules:
+
+  * kit_requests() / assemble_kit() / build_kit() follow the browser code
+    step by step: four category searches, then the allergy, budget,
+    weather, diet and equipment-gap pass over the hits. They work with any
+    search backend (local_search.LocalIndex or the remote index).
+  * KitCatalog stores the catalog as columnar NumPy arrays and evaluates the
+    four searches plus every filter for a whole batch of profiles at once.
+    Its search step reproduces LocalIndex ranking (all words required, last
+    word prefix, attribute criterion, then customRanking), so for the same
+    records both paths return identical kits and alerts.
+
+    python kit_builder.py /tmp/items.json --profiles 5000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from index_config import INDEX_NAME, INDEX_SETTINGS
+from local_search import as_list, attribute_name, ranked, tokenize
+
+ALL_CATEGORIES = ["exercise", "supplement", "gear", "meal_plan"]
+BUDGET_LIMITS = {"budget": 50, "moderate": 200}
+NO_MATCH = 127
+
+# Profile options offered by the UI.
+PROFILE_GOALS = [
+    "weight loss", "muscle building", "endurance", "flexibility",
+    "stress relief", "better sleep", "general fitness", "injury recovery",
+]
+PROFILE_DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+PROFILE_ALLERGIES = ["dairy", "soy", "nuts", "eggs", "fish", "gluten"]
+PROFILE_DIETS = ["any", "omnivore", "vegetarian", "vegan", "keto", "mediterranean", "gluten-free"]
+PROFILE_WEATHERS = ["any", "cold", "hot", "mild", "rainy"]
+PROFILE_BUDGETS = ["any", "budget", "moderate", "premium"]
+
+
+def hits_per_page(category):
+    return 5 if category == "exercise" else 3
+
+
+def safe_array(value):
+    return value if isinstance(value, list) else []
+
+
+def safe_string(value, fallback=""):
+    return value if isinstance(value, str) else fallback
+
+
+def equipment_key(value):
+    # provides_equipment holds normalized needs (see generate_dataset.equipment_vocabulary).
+    return safe_string(value).strip().lower()
+
+
+def safe_number(value, fallback=0):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        return fallback
+    return value
+
+
+def random_profile(rng=random):
+    return {
+        "goals": rng.sample(PROFILE_GOALS, rng.randint(1, 3)),
+        "difficulty": rng.choice(PROFILE_DIFFICULTIES),
+        "allergies": rng.sample(PROFILE_ALLERGIES, rng.choice([0, 0, 1, 2])),
+        "budget": rng.choice(PROFILE_BUDGETS),
+        "weather": rng.choice(PROFILE_WEATHERS),
+        "indoor_only": rng.random() < 0.3,
+        "diet": rng.choice(PROFILE_DIETS),
+    }
+
+
+# --- request-level port ---
+
+def kit_requests(profile, index_name=INDEX_NAME):
+    requests = []
+    for category in ALL_CATEGORIES:
+        category_filters = [[f"category:{category}"]]
+        if profile["difficulty"] != "any":
+            category_filters.append([f"difficulty:{profile['difficulty']}", "difficulty:beginner"])
+        if profile["indoor_only"] and category == "exercise":
+            category_filters.append(["indoor:true"])
+        requests.append({
+            "indexName": index_name,
+            "query": " ".join(profile["goals"]),
+            "hitsPerPage": hits_per_page(category),
+            "facetFilters": category_filters,
+        })
+    return requests
+
+
+def allergy_alert(hit, conflict):
+    return f"\"{safe_string(hit.get('name'), 'Item')}\" contains {', '.join(conflict)} — excluded from your kit due to allergy settings"
+
+
+def weather_alert(hit, weather):
+    return f"\"{safe_string(hit.get('name'), 'Item')}\" may not be ideal for {weather} weather — included but flagged"
+
+
+def equipment_alert(need):
+    return f"Your exercises need \"{need}\" — consider adding matching gear to your kit"
+
+
+def assemble_kit(profile, hits_by_category):
+    """Apply the buildKit filter pass to per-category hit lists (in ALL_CATEGORIES order)."""
+    kit, alerts = [], []
+    for category, hits in zip(ALL_CATEGORIES, hits_by_category):
+        for hit in hits:
+            hit_allergens = safe_array(hit.get("allergens"))
+            hit_weather = safe_array(hit.get("weather_suitability"))
+
+            # Allergy check
+            conflict = [a for a in hit_allergens if a in profile["allergies"]]
+            if conflict:
+                alerts.append(allergy_alert(hit, conflict))
+                continue
+
+            # Budget check
+            price = safe_number(hit.get("price_range_usd"))
+            if price > BUDGET_LIMITS.get(profile["budget"], float("inf")):
+                continue
+
+            # Weather check
+            if (profile["weather"] != "any" and hit_weather
+                    and "any" not in hit_weather and profile["weather"] not in hit_weather):
+                alerts.append(weather_alert(hit, profile["weather"]))
+
+            # Diet check for meal plans
+            diet_type = hit.get("diet_type")
+            if (category == "meal_plan" and profile["diet"] != "any" and diet_type
+                    and diet_type != "flexible" and diet_type != profile["diet"]):
+                continue
+
+            kit.append(hit)
+
+    # Equipment overlap check
+    needs = {}
+    for item in kit:
+        if safe_string(item.get("category")) == "exercise":
+            for need in safe_array(item.get("equipment")):
+                key = equipment_key(need)
+                if key and key not in needs:
+                    needs[key] = need
+    gear_provided = {equipment_key(p) for i in kit if safe_string(i.get("category")) == "gear"
+                     for p in safe_array(i.get("provides_equipment"))}
+    for key, need in needs.items():
+        if key not in gear_provided:
+            alerts.append(equipment_alert(need))
+    return {"items": kit, "alerts": alerts}
+
+
+def build_kit(search, profile, index_name=INDEX_NAME):
+    """`search` takes a list of request dicts and returns {"results": [...]}, like multi_search."""
+    if not profile["goals"]:
+        return {"items": [], "alerts": []}
+    results = search(kit_requests(profile, index_name))["results"]
+    return assemble_kit(profile, [r["hits"] for r in results])
+
+
+# --- vectorized batch engine ---
+
+def encode_sets(rows, vocab):
+    """Encode each row (a list of strings) as a bitmask over `vocab`, shape (len(rows), words)."""
+    words = max(1, (len(vocab) + 63) // 64)
+    out = np.zeros((len(rows), words), dtype=np.uint64)
+    for i, row in enumerate(rows):
+        for value in row:
+            bit = vocab.get(value)
+            if bit is not None:
+                out[i, bit >> 6] |= np.uint64(1 << (bit & 63))
+    return out
+
+
+def any_common(a, b):
+    return (a & b).any(axis=-1)
+
+
+def vocabulary(values):
+    return {v: i for i, v in enumerate(sorted(set(values)))}
+
+
+class KitCatalog:
+    def __init__(self, records, settings=None):
+        settings = settings or INDEX_SETTINGS
+        self.records = records = ranked(records, settings)
+        self.n = len(records)
+
+        def codes(values, vocab):
+            return np.array([vocab.get(v, -1) for v in values], dtype=np.int32)
+
+        categories = [str(r.get("category", "")).lower() for r in records]
+        self.category_vocab = vocabulary(categories)
+        self.category = codes(categories, self.category_vocab)
+
+        difficulties = [str(r.get("difficulty", "")).lower() for r in records]
+        self.difficulty_vocab = vocabulary(difficulties)
+        self.difficulty = codes(difficulties, self.difficulty_vocab)
+
+        self.indoor = np.array([r.get("indoor") is True for r in records], dtype=bool)
+        self.price = np.array([safe_number(r.get("price_range_usd")) for r in records], dtype=np.float64)
+
+        diets = [r.get("diet_type") or None for r in records]
+        self.diet_vocab = vocabulary(d for d in diets if d is not None)
+        self.diet = np.array([self.diet_vocab[d] if d is not None else -1 for d in diets], dtype=np.int32)
+        self.flexible = self.diet_vocab.get("flexible", -2)
+
+        allergens = [safe_array(r.get("allergens")) for r in records]
+        self.allergen_vocab = vocabulary(a for row in allergens for a in row)
+        self.allergens = encode_sets(allergens, self.allergen_vocab)
+
+        weather = [safe_array(r.get("weather_suitability")) for r in records]
+        self.weather_vocab = vocabulary([w for row in weather for w in row] + ["any"])
+        self.weather = encode_sets(weather, self.weather_vocab)
+        self.has_weather = np.array([bool(row) for row in weather], dtype=bool)
+        self.weather_any = encode_sets([["any"]], self.weather_vocab)[0]
+
+        # Equipment needs per doc, and which of those needs each doc
+        # satisfies (provides_equipment, set on gear records).
+        equipment = [[k for k in map(equipment_key, safe_array(r.get("equipment"))) if k] for r in records]
+        self.equipment_vocab = vocabulary(e for row in equipment for e in row)
+        self.equipment = encode_sets(equipment, self.equipment_vocab)
+        self.provides = encode_sets([[equipment_key(p) for p in safe_array(r.get("provides_equipment"))]
+                                     for r in records], self.equipment_vocab)
+
+        # Searchable attributes as per-doc ids into the distinct value sets,
+        # so a query word is resolved once per distinct value, not per doc.
+        self.searchable = [attribute_name(a) for a in settings.get("searchableAttributes", [])]
+        self._value_keys = []
+        self._value_tokens = []
+        for attr in self.searchable:
+            key_ids, token_sets = {}, []
+            ids = np.empty(self.n, dtype=np.int32)
+            for doc, record in enumerate(records):
+                value = tuple(str(v) for v in as_list(record.get(attr)))
+                key = key_ids.get(value)
+                if key is None:
+                    key = key_ids[value] = len(token_sets)
+                    token_sets.append(frozenset(t for v in value for t in tokenize(v)))
+                ids[doc] = key
+            self._value_keys.append(ids)
+            self._value_tokens.append(token_sets)
+        self.tokens = frozenset().union(*(t for sets in self._value_tokens for t in sets))
+        self._word_cache = {}
+        self._facet_cache = {}
+        self._search_cache = {}
+
+    def word_positions(self, word, prefix):
+        """Per doc, the first searchable attribute containing `word` (NO_MATCH if none)."""
+        key = (word, prefix)
+        best = self._word_cache.get(key)
+        if best is None:
+            best = np.full(self.n, NO_MATCH, dtype=np.int8)
+            for pos in reversed(range(len(self.searchable))):
+                has = np.array([
+                    word in tokens or (prefix and any(t.startswith(word) for t in tokens))
+                    for tokens in self._value_tokens[pos]
+                ], dtype=bool)
+                if has.any():
+                    best[has[self._value_keys[pos]]] = pos
+            self._word_cache[key] = best
+        return best
+
+    def facet_mask(self, difficulty, indoor_only, category):
+        # Only a few dozen facet combinations exist; build each mask once.
+        key = (difficulty, indoor_only and category == "exercise", category)
+        mask = self._facet_cache.get(key)
+        if mask is None:
+            mask = self.category == self.category_vocab.get(category, -2)
+            if difficulty is not None:
+                mask &= ((self.difficulty == self.difficulty_vocab.get(difficulty, -2))
+                         | (self.difficulty == self.difficulty_vocab.get("beginner", -2)))
+            if key[1]:
+                mask &= self.indoor
+            self._facet_cache[key] = mask
+        return mask
+
+    def search(self, words, difficulty, indoor_only, category):
+        key = (words, difficulty, indoor_only, category)
+        hits = self._search_cache.get(key)
+        if hits is not None:
+            return hits
+        mask = self.facet_mask(difficulty, indoor_only, category).copy()
+        tier = None
+        for i, word in enumerate(words):
+            positions = self.word_positions(word, prefix=i == len(words) - 1)
+            mask &= positions != NO_MATCH
+            tier = positions if tier is None else np.minimum(tier, positions)
+        docs = np.flatnonzero(mask)
+        if tier is not None:
+            docs = docs[np.argsort(tier[docs], kind="stable")]
+        hits = self._search_cache[key] = docs[:hits_per_page(category)]
+        return hits
+
+    def build_kits(self, profiles):
+        slots = [c for c in ALL_CATEGORIES for _ in range(hits_per_page(c))]
+        hits = np.full((len(profiles), len(slots)), -1, dtype=np.int64)
+        rows = {}
+        for p, profile in enumerate(profiles):
+            if not profile["goals"]:
+                continue
+            difficulty = profile["difficulty"].lower() if profile["difficulty"] != "any" else None
+            key = (tuple(tokenize(" ".join(profile["goals"]))), difficulty, bool(profile["indoor_only"]))
+            row = rows.get(key)
+            if row is None:
+                row = np.full(len(slots), -1, dtype=np.int64)
+                start = 0
+                for category in ALL_CATEGORIES:
+                    docs = self.search(*key, category)
+                    row[start:start + len(docs)] = docs
+                    start += hits_per_page(category)
+                rows[key] = row
+            hits[p] = row
+
+        valid = hits >= 0
+        docs = np.where(valid, hits, 0)
+
+        allergies = encode_sets([p["allergies"] for p in profiles], self.allergen_vocab)
+        limits = np.array([BUDGET_LIMITS.get(p["budget"], np.inf) for p in profiles])
+        weather_set = np.array([p["weather"] != "any" for p in profiles], dtype=bool)
+        weather_ok = encode_sets([[p["weather"]] for p in profiles], self.weather_vocab) | self.weather_any
+        diet_set = np.array([p["diet"] != "any" for p in profiles], dtype=bool)
+        diets = np.array([self.diet_vocab.get(p["diet"], -2) for p in profiles], dtype=np.int32)
+
+        allergic = valid & any_common(self.allergens[docs], allergies[:, None, :])
+        kept = valid & ~allergic & ~(self.price[docs] > limits[:, None])
+        flagged = (kept & weather_set[:, None] & self.has_weather[docs]
+                   & ~any_common(self.weather[docs], weather_ok[:, None, :]))
+        doc_diet = self.diet[docs]
+        off_diet = ((self.category[docs] == self.category_vocab.get("meal_plan", -2)) & diet_set[:, None]
+                    & (doc_diet >= 0) & (doc_diet != self.flexible) & (doc_diet != diets[:, None]))
+        included = kept & ~off_diet
+
+        is_exercise = self.category[docs] == self.category_vocab.get("exercise", -2)
+        is_gear = self.category[docs] == self.category_vocab.get("gear", -2)
+        zero = np.uint64(0)
+        needs = np.bitwise_or.reduce(np.where((included & is_exercise)[..., None], self.equipment[docs], zero), axis=1)
+        provided = np.bitwise_or.reduce(np.where((included & is_gear)[..., None], self.provides[docs], zero), axis=1)
+        gaps = needs & ~provided
+        has_gap = gaps.any(axis=1)
+
+        kits = []
+        for p, profile in enumerate(profiles):
+            items, alerts = [], []
+            for s in range(len(slots)):
+                if not valid[p, s]:
+                    continue
+                hit = self.records[hits[p, s]]
+                if allergic[p, s]:
+                    conflict = [a for a in safe_array(hit.get("allergens")) if a in profile["allergies"]]
+                    alerts.append(allergy_alert(hit, conflict))
+                    continue
+                if flagged[p, s]:
+                    alerts.append(weather_alert(hit, profile["weather"]))
+                if included[p, s]:
+                    items.append(hit)
+            if has_gap[p]:
+                seen = set()
+                for item in items:
+                    if item.get("category") != "exercise":
+                        continue
+                    for need in safe_array(item.get("equipment")):
+                        key = equipment_key(need)
+                        if not key or key in seen:
+                            continue
+                        seen.add(key)
+                        bit = self.equipment_vocab[key]
+                        if int(gaps[p, bit >> 6]) >> (bit & 63) & 1:
+                            alerts.append(equipment_alert(need))
+            kits.append({"items": items, "alerts": alerts})
+        return kits
+
+
+if __name__ == "__main__":
+    from sinks import iter_catalog
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="items.json or NDJSON produced by generate_dataset.py")
+    parser.add_argument("--profiles", type=int, default=1000, help="random profiles to build kits for")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    catalog = KitCatalog(list(iter_catalog(args.path)))
+    print(f"Loaded {catalog.n} records in {time.perf_counter() - t0:.2f}s")
+
+    rng = random.Random(args.seed)
+    profiles = [random_profile(rng) for _ in range(args.profiles)]
+    t0 = time.perf_counter()
+    kits = catalog.build_kits(profiles)
+    elapsed = time.perf_counter() - t0
+    print(f"Built {len(kits)} kits in {elapsed:.3f}s ({len(kits) / elapsed:.0f} kits/s)")
+    sample = kits[0]
+    print(f"  e.g. {profiles[0]['goals']}: {[i['name'] for i in sample['items']]}")
+    for alert in sample["alerts"]:
+        print(f"    ! {alert}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Materialized kit cache keyed by a canonical profile signature.
+
+Many profiles produce the same kit. profile_key() folds them together:
+
+  * goals are sorted, unless the last word of some goal is also a proper
+    prefix of another indexed token (the query's last word is prefix-matched,
+    so reordering could then change the hits),
+  * allergies are deduplicated, sorted, and dropped when no catalog item
+    carries them,
+  * budgets without a price cutoff ("premium") become "any".
+
+materialize() runs KitCatalog.build_kits over the hot part of the profile
+space and writes the kits to a SQLite file: objectIDs and alert strings are
+stored once and each kit is two packed uint32 arrays. KitCache serves
+lookups from an in-memory LRU, then the store, then computes and caches the
+kit. Both the store and the LRU are tied to the catalog content hash, so a
+regenerated catalog never serves stale kits.
+
+    python kit_cache.py /tmp/items.json /tmp/kits.sqlite --max-goals 2
+"""
+
+import argparse
+import itertools
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+
+from delta_sync import catalog_hash
+from kit_builder import (
+    BUDGET_LIMITS, KitCatalog, PROFILE_ALLERGIES, PROFILE_BUDGETS, PROFILE_DIETS,
+    PROFILE_DIFFICULTIES, PROFILE_GOALS, PROFILE_WEATHERS,
+)
+from local_search import tokenize
+
+DEFAULT_LRU_SIZE = 4096
+MATERIALIZE_BATCH = 5000
+
+
+def order_sensitive_words(catalog, goals=PROFILE_GOALS):
+    # Goal-final words whose prefix expansion reaches other tokens.
+    words = {tokenize(g)[-1] for g in goals if tokenize(g)}
+    return {w for w in words if any(t != w and t.startswith(w) for t in catalog.tokens)}
+
+
+def canonical_profile(profile, catalog, sensitive_words):
+    goals = list(profile["goals"])
+    if not any(tokenize(g) and tokenize(g)[-1] in sensitive_words for g in goals):
+        goals.sort()
+    return {
+        "goals": goals,
+        "difficulty": profile["difficulty"],
+        "allergies": sorted({a for a in profile["allergies"] if a in catalog.allergen_vocab}),
+        "budget": profile["budget"] if profile["budget"] in BUDGET_LIMITS else "any",
+        "weather": profile["weather"],
+        "indoor_only": bool(profile["indoor_only"]),
+        "diet": profile["diet"],
+    }
+
+
+def profile_key(canonical):
+    return "\x1f".join([
+        "|".join(canonical["goals"]),
+        canonical["difficulty"],
+        "|".join(canonical["allergies"]),
+        canonical["budget"],
+        canonical["weather"],
+        "1" if canonical["indoor_only"] else "0",
+        canonical["diet"],
+    ])
+
+
+def hot_profiles(catalog, max_goals=1, max_allergies=1):
+    """Every UI profile with at most `max_goals` goals and `max_allergies` carried allergies."""
+    allergies = [a for a in PROFILE_ALLERGIES if a in catalog.allergen_vocab]
+    budgets = sorted({b if b in BUDGET_LIMITS else "any" for b in PROFILE_BUDGETS})
+    goal_sets = [list(c) for n in range(1, max_goals + 1) for c in itertools.combinations(sorted(PROFILE_GOALS), n)]
+    allergy_sets = [list(c) for n in range(max_allergies + 1) for c in itertools.combinations(allergies, n)]
+    for goals, difficulty, allergy, budget, weather, indoor, diet in itertools.product(
+            goal_sets, PROFILE_DIFFICULTIES, allergy_sets, budgets, PROFILE_WEATHERS, (False, True), PROFILE_DIETS):
+        yield {"goals": goals, "difficulty": difficulty, "allergies": allergy, "budget": budget,
+               "weather": weather, "indoor_only": indoor, "diet": diet}
+
+
+def materialize(catalog, path, profiles, catalog_digest=None, log=print):
+    catalog_digest = catalog_digest or catalog_hash(catalog.records)
+    sensitive = order_sensitive_words(catalog)
+    doc_of = {r["objectID"]: i for i, r in enumerate(catalog.records)}
+    alert_ids = {}
+
+    db = sqlite3.connect(path)
+    db.executescript("""
+        DROP TABLE IF EXISTS meta;
+        DROP TABLE IF EXISTS objects;
+        DROP TABLE IF EXISTS alerts;
+        DROP TABLE IF EXISTS kits;
+        CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE objects (id INTEGER PRIMARY KEY, object_id TEXT);
+        CREATE TABLE alerts (id INTEGER PRIMARY KEY, text TEXT);
+        CREATE TABLE kits (key TEXT PRIMARY KEY, items BLOB, alerts BLOB) WITHOUT ROWID;
+    """)
+    db.executemany("INSERT INTO objects VALUES (?, ?)", ((i, r["objectID"]) for i, r in enumerate(catalog.records)))
+
+    seen, written = set(), 0
+    batch = []
+
+    def flush():
+        nonlocal written
+        kits = catalog.build_kits([p for _, p in batch])
+        rows = []
+        for (key, _), kit in zip(batch, kits):
+            alerts = array("I", (alert_ids.setdefault(a, len(alert_ids)) for a in kit["alerts"]))
+            items = array("I", (doc_of[i["objectID"]] for i in kit["items"]))
+            rows.append((key, items.tobytes(), alerts.tobytes()))
+        db.executemany("INSERT INTO kits VALUES (?, ?, ?)", rows)
+        written += len(rows)
+        batch.clear()
+
+    start = time.perf_counter()
+    for profile in profiles:
+        canonical = canonical_profile(profile, catalog, sensitive)
+        key = profile_key(canonical)
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append((key, canonical))
+        if len(batch) >= MATERIALIZE_BATCH:
+            flush()
+    if batch:
+        flush()
+
+    db.executemany("INSERT INTO alerts VALUES (?, ?)", ((i, text) for text, i in alert_ids.items()))
+    db.executemany("INSERT INTO meta VALUES (?, ?)", [("catalog_hash", catalog_digest), ("kits", str(written))])
+    db.commit()
+    db.close()
+    if log is not None:
+        log(f"  Materialized {written} kits in {time.perf_counter() - start:.2f}s to {path}")
+    return written
+
+
+class KitCache:
+    def __init__(self, catalog, store_path=None, lru_size=DEFAULT_LRU_SIZE, catalog_digest=None):
+        self.lru_size = lru_size
+        self.store_path = store_path
+        self.hits = {"lru": 0, "store": 0, "computed": 0}
+        self._db = None
+        self.load_catalog(catalog, catalog_digest)
+
+    def load_catalog(self, catalog, catalog_digest=None):
+        """Switch catalogs; cached kits survive only if the content hash is unchanged."""
+        digest = catalog_digest or catalog_hash(catalog.records)
+        self.catalog = catalog
+        self._sensitive = order_sensitive_words(catalog)
+        self._doc_of = {r["objectID"]: i for i, r in enumerate(catalog.records)}
+        if getattr(self, "catalog_digest", None) != digest:
+            self.catalog_digest = digest
+            self._lru = OrderedDict()
+            self._open_store()
+
+    def _open_store(self):
+        if self._db is not None:
+            self._db.close()
+        self._db = None
+        if not self.store_path:
+            return
+        try:
+            db = sqlite3.connect(f"file:{self.store_path}?mode=ro", uri=True, check_same_thread=False)
+            stored = db.execute("SELECT value FROM meta WHERE name = 'catalog_hash'").fetchone()
+        except sqlite3.Error:
+            return
+        if not stored or stored[0] != self.catalog_digest:
+            db.close()
+            return
+        self._db = db
+        self._objects = [row[0] for row in db.execute("SELECT object_id FROM objects ORDER BY id")]
+        self._alerts = dict(db.execute("SELECT id, text FROM alerts"))
+
+    @property
+    def store_active(self):
+        return self._db is not None
+
+    def key(self, profile):
+        return profile_key(canonical_profile(profile, self.catalog, self._sensitive))
+
+    def get(self, profile):
+        canonical = canonical_profile(profile, self.catalog, self._sensitive)
+        key = profile_key(canonical)
+        kit = self._lru.get(key)
+        if kit is not None:
+            self._lru.move_to_end(key)
+            self.hits["lru"] += 1
+            return kit
+
+        kit = self._from_store(key)
+        if kit is not None:
+            self.hits["store"] += 1
+        else:
+            kit = self.catalog.build_kits([canonical])[0]
+            self.hits["computed"] += 1
+        self._lru[key] = kit
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+        return kit
+
+    def _from_store(self, key):
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT items, alerts FROM kits WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        records = self.catalog.records
+        items = [records[self._doc_of[self._objects[i]]] for i in array("I", row[0])]
+        alerts = [self._alerts[i] for i in array("I", row[1])]
+        return {"items": items, "alerts": alerts}
+
+
+if __name__ == "__main__":
+    from sinks import iter_catalog
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="items.json or NDJSON produced by generate_dataset.py")
+    parser.add_argument("store", help="SQLite file to write")
+    parser.add_argument("--max-goals", type=int, default=1)
+    parser.add_argument("--max-allergies", type=int, default=1)
+    args = parser.parse_args()
+
+    catalog = KitCatalog(list(iter_catalog(args.path)))
+    materialize(catalog, args.store, hot_profiles(catalog, args.max_goals, args.max_allergies))
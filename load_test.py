@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Replay kit-building search traffic against an index and report latency.
+
+Profiles come from the option lists the UI offers (kit_builder.random_profile)
+and requests from kit_builder.kit_requests, so every kit sends exactly what
+app/page.tsx sends. Two strategies are compared:
+
+  * four   one POST /1/indexes/*/queries per category, all four in flight
+           at once (the frontend's Promise.all)
+  * multi  the same four requests folded into one multi-query POST
+
+Load is closed-loop (--concurrency users, each starting its next kit when
+the last one finished) or open-loop (--rate kits/s, Poisson arrivals).
+Open-loop latency is measured from the scheduled arrival, so time spent
+queued behind slow kits counts instead of silently lowering the load.
+
+Without --endpoint a local algolia_standin is started in a subprocess and
+loaded with --catalog FILE or a freshly generated --count records:
+
+    python load_test.py --count 20000 --concurrency 8 --duration 10
+    python load_test.py --endpoint https://RM2LBYLLID-dsn.algolia.net --rate 20 --duration 30
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from bulk_upload import Transport, UploadError
+from index_config import APP_ID, INDEX_NAME
+from kit_builder import kit_requests, random_profile
+from metrics import percentile
+
+SEARCH_KEY = "00076acd167ffcfcf8bec05ae031852a"  # the public search-only key app/page.tsx uses
+QUERIES_PATH = "/1/indexes/*/queries"
+STRATEGIES = ["four", "multi"]
+DEFAULT_WARMUP = 20
+MAX_IN_FLIGHT = 256
+
+
+def search_host(app_id):
+    return f"https://{app_id}-dsn.algolia.net"
+
+
+def encode(requests):
+    return json.dumps({"requests": requests}, separators=(",", ":")).encode()
+
+
+class KitClient:
+    """Sends one kit's searches with a given strategy; thread-safe."""
+
+    def __init__(self, transport, strategy, request_pool=None):
+        self.transport = transport
+        self.strategy = strategy
+        self.request_pool = request_pool
+
+    def _send(self, body):
+        start = time.perf_counter()
+        response = self.transport.request("POST", QUERIES_PATH, body)
+        return time.perf_counter() - start, response
+
+    def build(self, profile):
+        """Return the per-request latencies; raises UploadError on a failed request."""
+        requests = kit_requests(profile, INDEX_NAME)
+        if self.strategy == "multi":
+            elapsed, response = self._send(encode(requests))
+            if len(response.get("results", [])) != len(requests):
+                raise UploadError("multi-query answered with the wrong number of results")
+            return [elapsed]
+        futures = [self.request_pool.submit(self._send, encode([r])) for r in requests]
+        return [f.result()[0] for f in futures]
+
+
+def closed_loop(client, profiles, concurrency, deadline):
+    """Each user thread builds kits back to back; yields (latency, request latencies | None)."""
+    results, lock = [], threading.Lock()
+    feed = iter(profiles)
+
+    def user():
+        while time.perf_counter() < deadline:
+            with lock:
+                profile = next(feed, None)
+            if profile is None:
+                return
+            start = time.perf_counter()
+            try:
+                requests = client.build(profile)
+            except UploadError:
+                requests = None
+            with lock:
+                results.append((time.perf_counter() - start, requests))
+
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def open_loop(client, profiles, rate, deadline, rng, max_in_flight=MAX_IN_FLIGHT):
+    """Start kits at Poisson arrival times; latency counts from the scheduled arrival."""
+    results, lock = [], threading.Lock()
+
+    def kit(scheduled, profile):
+        try:
+            requests = client.build(profile)
+        except UploadError:
+            requests = None
+        with lock:
+            results.append((time.perf_counter() - scheduled, requests))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        futures = []
+        next_at = time.perf_counter()
+        for profile in profiles:
+            next_at += rng.expovariate(rate)
+            if next_at >= deadline:
+                break
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(kit, next_at, profile))
+        wait(futures)
+    return results
+
+
+def summarize(strategy, results, elapsed):
+    ok = sorted(latency for latency, requests in results if requests is not None)
+    requests = sorted(r for _, rs in results if rs is not None for r in rs)
+    ms = lambda values, q: round(percentile(values, q) * 1000, 3)  # noqa: E731
+    return {
+        "strategy": strategy,
+        "kits": len(ok),
+        "errors": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "kits_per_s": round(len(ok) / elapsed, 1) if elapsed else 0.0,
+        "http_requests_per_s": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "kit_ms": {"p50": ms(ok, 50), "p90": ms(ok, 90), "p99": ms(ok, 99), "max": ms(ok, 100)},
+        "request_ms": {"p50": ms(requests, 50), "p99": ms(requests, 99)},
+    }
+
+
+def run_strategy(transport, strategy, args, log=print):
+    users = args.concurrency if args.rate is None else MAX_IN_FLIGHT
+    pool = ThreadPoolExecutor(max_workers=4 * users) if strategy == "four" else None
+    client = KitClient(transport, strategy, pool)
+    # Same seed for every strategy, so both replay the same profiles.
+    rng = random.Random(args.seed)
+    profiles = (random_profile(rng) for _ in range(args.kits or sys.maxsize))
+    try:
+        for profile in [random_profile(random.Random(i)) for i in range(args.warmup)]:
+            client.build(profile)
+        start = time.perf_counter()
+        deadline = start + args.duration
+        if args.rate is None:
+            results = closed_loop(client, profiles, args.concurrency, deadline)
+        else:
+            results = open_loop(client, profiles, args.rate, deadline, rng)
+        summary = summarize(strategy, results, time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    k, r = summary["kit_ms"], summary["request_ms"]
+    log(f"  {strategy:<6} {summary['kits']} kits ({summary['errors']} errors) in {summary['elapsed_s']:.1f}s: "
+        f"{summary['kits_per_s']:.1f} kits/s, {summary['http_requests_per_s']:.1f} req/s; "
+        f"kit p50 {k['p50']:.2f}ms p90 {k['p90']:.2f}ms p99 {k['p99']:.2f}ms max {k['max']:.2f}ms; "
+        f"request p50 {r['p50']:.2f}ms p99 {r['p99']:.2f}ms")
+    return summary
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin(catalog, latency_ms=0, log=print):
+    """Run algolia_standin.py in its own process so it does not share our GIL."""
+    port = free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "algolia_standin.py")
+    proc = subprocess.Popen(
+        [sys.executable, script, "--port", str(port), "--catalog", catalog, "--latency-ms", str(latency_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    for line in proc.stdout:
+        log(f"  [stand-in] {line.rstrip()}")
+        if "listening" in line:
+            return proc, f"http://127.0.0.1:{port}"
+    raise RuntimeError(f"stand-in exited with status {proc.wait()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", help=f"search API base URL, e.g. {search_host(APP_ID)} "
+                                           "(default: start a local stand-in)")
+    parser.add_argument("--app-id", default=APP_ID)
+    parser.add_argument("--api-key", default=SEARCH_KEY)
+    parser.add_argument("--catalog", help="records for the local stand-in (items.json, NDJSON or columnar)")
+    parser.add_argument("--count", type=int, default=20_000, help="records to generate when --catalog is not given")
+    parser.add_argument("--latency-ms", type=int, default=0, help="stand-in delay per request, to mimic network RTT")
+    parser.add_argument("--strategy", choices=STRATEGIES + ["both"], default="both")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="closed-loop virtual users (default: %(default)s)")
+    load.add_argument("--rate", type=float, help="open-loop arrival rate in kits/s")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per strategy")
+    parser.add_argument("--kits", type=int, help="stop after this many kits per strategy")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="unmeasured kits before each run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also save the summaries as JSON")
+    args = parser.parse_args()
+
+    standin = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        catalog = args.catalog
+        if catalog is None:
+            from generate_dataset import iter_all_items, write_ndjson
+
+            catalog = os.path.join(tempfile.gettempdir(), f"load_test_{args.count}.ndjson")
+            n = write_ndjson(iter_all_items(count=args.count, seed=args.seed), catalog)
+            print(f"Generated {n} records into {catalog}")
+        standin, endpoint = start_standin(catalog, args.latency_ms)
+
+    mode = f"{args.concurrency} users" if args.rate is None else f"{args.rate:g} kits/s"
+    print(f"Replaying kit traffic against {endpoint} ({mode}, {args.duration:g}s per strategy)")
+    transport = Transport(endpoint, args.app_id, args.api_key)
+    try:
+        strategies = STRATEGIES if args.strategy == "both" else [args.strategy]
+        summaries = [run_strategy(transport, s, args) for s in strategies]
+    finally:
+        if standin is not None:
+            standin.terminate()
+            standin.wait()
+
+    if len(summaries) == 2:
+        four, multi = summaries
+        if four["kit_ms"]["p99"]:
+            change = (multi["kit_ms"]["p99"] - four["kit_ms"]["p99"]) / four["kit_ms"]["p99"]
+            print(f"  multi-query kit p99 is {change:+.1%} vs four requests")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"endpoint": endpoint, "mode": mode, "results": summaries}, f, indent=2)
+        print(f"Saved results to {args.json}")
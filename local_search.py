@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""In-process search over generated records, mirroring INDEX_SETTINGS.
+
+Builds an inverted index over the declared searchableAttributes and facet
+postings for attributesForFaceting, then answers the same request shape the
+frontend sends: a query (all words required, last word prefix-matched),
+facetFilters with AND-of-OR semantics, numericFilters, and hits ordered by
+the attribute criterion followed by customRanking (desc(rating)).
+
+Documents are numbered in customRanking order, so every postings list is
+already ranked and a page of hits is just the first set bits. Postings are
+packed little-endian bitmaps when dense and sorted doc-id arrays when
+sparse (fewer than one doc in 32), which keeps a few-million-record index
+in memory while AND/OR stay vectorized. Typo tolerance, synonyms and
+highlighting are not modelled.
+
+    python local_search.py /tmp/items.json "weight loss" --facet category:exercise
+"""
+
+import argparse
+import bisect
+import re
+import time
+from array import array
+
+import numpy as np
+
+from index_config import INDEX_SETTINGS
+
+TOKEN_RE = re.compile(r"\w+")
+MODIFIER_RE = re.compile(r"^\w+\((\w+)\)$")
+RANKING_RE = re.compile(r"^(asc|desc)\((\w+)\)$")
+NUMERIC_RE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|<|>|=)\s*(-?\d+(?:\.\d+)?)\s*$")
+RANGE_RE = re.compile(r"^\s*(\w+)\s*:\s*(-?\d+(?:\.\d+)?)\s+TO\s+(-?\d+(?:\.\d+)?)\s*$")
+
+SPARSE_RATIO = 32         # sparse when len(ids) * SPARSE_RATIO < n_docs
+MAX_NUMERIC_LEVELS = 256  # above this, numeric filters scan the column instead
+SCAN_CHUNK = 4096         # bitmap bytes unpacked per step when collecting hits
+WORD_CACHE_SIZE = 4096
+FILTER_CACHE_SIZE = 1024
+
+_SPARSE_DTYPE = np.int64
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def attribute_name(spec):
+    m = MODIFIER_RE.match(spec)
+    return m.group(1) if m else spec
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def facet_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).lower()
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def ranked(records, settings):
+    """`records` in customRanking order; LocalIndex and KitCatalog number docs by it."""
+    ranking = [RANKING_RE.match(r).groups() for r in settings.get("customRanking", [])]
+    order = list(range(len(records)))
+    # Stable sorts from the least significant criterion up.
+    for direction, attr in reversed(ranking):
+        order.sort(key=lambda i: records[i].get(attr) or 0, reverse=direction == "desc")
+    return [records[i] for i in order]
+
+
+class LocalIndex:
+    def __init__(self, records, settings=None):
+        settings = settings or INDEX_SETTINGS
+        self.settings = settings
+        self.searchable = [attribute_name(a) for a in settings.get("searchableAttributes", [])]
+        self.faceting = [attribute_name(a) for a in settings.get("attributesForFaceting", [])]
+        self.retrieve = settings.get("attributesToRetrieve")
+        self.hits_per_page = settings.get("hitsPerPage", 20)
+
+        self.records = ranked(records, settings)
+        self.n = len(self.records)
+        self.nbytes = (self.n + 7) // 8
+        self._all = self._dense_from_ids(np.arange(self.n, dtype=_SPARSE_DTYPE))
+        self._empty = np.empty(0, dtype=_SPARSE_DTYPE)
+        self._word_cache = {}
+        self._filter_cache = {}
+        self._build()
+
+    # --- construction ---
+
+    def _build(self):
+        text = {}
+        facets = {}
+        numeric_values = {attr: [] for attr in self.faceting}
+        # Generated catalogs repeat the same strings endlessly; tokenize each once.
+        token_cache = {}
+        for doc, record in enumerate(self.records):
+            for pos, attr in enumerate(self.searchable):
+                for value in as_list(record.get(attr)):
+                    tokens = token_cache.get(value)
+                    if tokens is None:
+                        tokens = token_cache[value] = set(tokenize(value))
+                    for token in tokens:
+                        text.setdefault((pos, token), array("q")).append(doc)
+            for attr in self.faceting:
+                values = as_list(record.get(attr))
+                for value in values:
+                    facets.setdefault((attr, facet_value(value)), array("q")).append(doc)
+                numeric = numeric_values[attr]
+                if numeric is not None:
+                    if values and all(is_number(v) for v in values):
+                        numeric.append(float(values[0]))
+                    elif values:
+                        numeric_values[attr] = None
+                    else:
+                        numeric.append(np.nan)
+
+        self.text = {key: self._finalize(ids) for key, ids in text.items()}
+        self.vocabulary = sorted({token for _, token in text})
+        self.facets = {key: self._finalize(ids) for key, ids in facets.items()}
+        self.numeric = {
+            attr: self._build_numeric(np.asarray(values, dtype=np.float64))
+            for attr, values in numeric_values.items()
+            if values is not None and not np.isnan(values).all()
+        }
+
+    def _finalize(self, ids):
+        # np.unique also drops repeats from a token seen in several list values.
+        ids = np.unique(np.frombuffer(ids, dtype=_SPARSE_DTYPE))
+        if len(ids) * SPARSE_RATIO < self.n:
+            return ids
+        return self._dense_from_ids(ids)
+
+    def _dense_from_ids(self, ids):
+        mask = np.zeros(self.nbytes * 8, dtype=bool)
+        mask[ids] = True
+        return np.packbits(mask, bitorder="little")
+
+    def _dense_from_mask(self, mask):
+        padded = np.zeros(self.nbytes * 8, dtype=bool)
+        padded[:self.n] = mask
+        return np.packbits(padded, bitorder="little")
+
+    def _build_numeric(self, column):
+        levels = np.unique(column[~np.isnan(column)])
+        if len(levels) > MAX_NUMERIC_LEVELS:
+            return ("column", column)
+        # le[i] holds every doc whose value is <= levels[i].
+        le = [self._dense_from_mask(column <= level) for level in levels]
+        return ("levels", levels.tolist(), le)
+
+    # --- postings algebra; None means "every document" ---
+
+    @staticmethod
+    def _is_dense(p):
+        return p.dtype == np.uint8
+
+    @staticmethod
+    def _test(bits, ids):
+        return ((bits[ids >> 3] >> (ids & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def _dense(self, p):
+        if p is None:
+            return self._all
+        return p if self._is_dense(p) else self._dense_from_ids(p)
+
+    def _and(self, a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if not len(a) or not len(b):
+            return self._empty
+        if self._is_dense(a) and self._is_dense(b):
+            return a & b
+        if self._is_dense(a):
+            a, b = b, a
+        if self._is_dense(b):
+            return a[self._test(b, a)]
+        return np.intersect1d(a, b, assume_unique=True)
+
+    def _or(self, a, b):
+        if a is None or b is None:
+            return None
+        if not len(a):
+            return b
+        if not len(b):
+            return a
+        if not self._is_dense(a) and not self._is_dense(b):
+            merged = np.union1d(a, b)
+            return merged if len(merged) * SPARSE_RATIO < self.n else self._dense_from_ids(merged)
+        return self._dense(a) | self._dense(b)
+
+    def _andnot(self, a, b):
+        if b is None:
+            return self._empty
+        if a is None:
+            return self._all & ~self._dense(b)
+        if self._is_dense(a):
+            return a & ~self._dense(b)
+        if self._is_dense(b):
+            return a[~self._test(b, a)]
+        return np.setdiff1d(a, b, assume_unique=True)
+
+    def _count(self, p):
+        if p is None:
+            return self.n
+        if not self._is_dense(p):
+            return len(p)
+        return int(np.bitwise_count(p).sum()) if hasattr(np, "bitwise_count") else int(np.unpackbits(p).sum())
+
+    def _take(self, p, skip, limit):
+        if limit <= 0:
+            return []
+        if p is None:
+            return list(range(skip, min(skip + limit, self.n)))
+        if not self._is_dense(p):
+            return p[skip:skip + limit].tolist()
+        out = []
+        for start in range(0, self.nbytes, SCAN_CHUNK):
+            chunk = p[start:start + SCAN_CHUNK]
+            nonzero = np.flatnonzero(chunk)
+            if not len(nonzero):
+                continue
+            if not skip:
+                # Every nonzero byte holds at least one doc.
+                nonzero = nonzero[:limit - len(out)]
+            rows, bits = np.nonzero(np.unpackbits(chunk[nonzero], bitorder="little").reshape(-1, 8))
+            docs = (nonzero[rows] + start) * 8 + bits
+            if skip >= len(docs):
+                skip -= len(docs)
+                continue
+            out.extend(docs[skip:skip + limit - len(out)].tolist())
+            skip = 0
+            if len(out) >= limit:
+                break
+        return out
+
+    # --- filters ---
+
+    def _facet(self, spec):
+        attr, sep, value = spec.partition(":")
+        if not sep:
+            raise ValueError(f"invalid facet filter {spec!r}")
+        attr = attr.strip()
+        negate = value.startswith("-")
+        if negate:
+            value = value[1:]
+        if attr in self.numeric and (attr, facet_value(value)) not in self.facets:
+            posting = self._numeric(f"{attr}={value}")
+        else:
+            posting = self.facets.get((attr, value.strip().lower()), self._empty)
+        return self._andnot(None, posting) if negate else posting
+
+    def _numeric(self, spec):
+        m = RANGE_RE.match(spec)
+        if m:
+            attr, low, high = m.group(1), float(m.group(2)), float(m.group(3))
+            return self._and(self._numeric_op(attr, ">=", low), self._numeric_op(attr, "<=", high))
+        m = NUMERIC_RE.match(spec)
+        if not m:
+            raise ValueError(f"invalid numeric filter {spec!r}")
+        return self._numeric_op(m.group(1), m.group(2), float(m.group(3)))
+
+    def _numeric_op(self, attr, op, value):
+        index = self.numeric.get(attr)
+        if index is None:
+            return self._empty
+        if index[0] == "column":
+            column = index[1]
+            mask = {
+                "<": column < value, "<=": column <= value, "=": column == value,
+                "!=": (column != value) & ~np.isnan(column), ">=": column >= value, ">": column > value,
+            }[op]
+            return self._dense_from_mask(mask)
+
+        _, levels, le = index
+
+        def at_most(i):
+            # Docs with value <= levels[i]; i < 0 means none.
+            return le[i] if i >= 0 else self._empty
+
+        present = le[-1] if le else self._empty
+        if op == "<=":
+            return at_most(bisect.bisect_right(levels, value) - 1)
+        if op == "<":
+            return at_most(bisect.bisect_left(levels, value) - 1)
+        if op == ">":
+            return self._andnot(present, at_most(bisect.bisect_right(levels, value) - 1))
+        if op == ">=":
+            return self._andnot(present, at_most(bisect.bisect_left(levels, value) - 1))
+        i = bisect.bisect_left(levels, value)
+        equal = self._andnot(le[i], at_most(i - 1)) if i < len(levels) and levels[i] == value else self._empty
+        return equal if op == "=" else self._andnot(present, equal)
+
+    def _filter_groups(self, filters, parse):
+        # Top-level entries are ANDed; a nested list is an OR group. Group
+        # results are cached: kit traffic reuses a handful of filter shapes.
+        result = None
+        if isinstance(filters, str):
+            filters = [filters]
+        for group in filters or []:
+            key = (parse.__name__, tuple(as_list(group)))
+            union = self._filter_cache.get(key)
+            if union is None:
+                union = self._empty
+                for spec in key[1]:
+                    union = self._or(union, parse(spec))
+                if len(self._filter_cache) >= FILTER_CACHE_SIZE:
+                    self._filter_cache.clear()
+                self._filter_cache[key] = union
+            result = self._and(result, union)
+        return result
+
+    # --- text ---
+
+    def _expand(self, word, prefix):
+        if not prefix:
+            return [word]
+        lo = bisect.bisect_left(self.vocabulary, word)
+        hi = bisect.bisect_left(self.vocabulary, word + "\uffff")
+        return self.vocabulary[lo:hi]
+
+    def _word(self, word, prefix):
+        key = (word, prefix)
+        cached = self._word_cache.get(key)
+        if cached is not None:
+            return cached
+        per_attribute = []
+        for pos in range(len(self.searchable)):
+            posting = self._empty
+            for token in self._expand(word, prefix):
+                hit = self.text.get((pos, token))
+                if hit is not None:
+                    posting = self._or(posting, hit)
+            per_attribute.append(posting)
+        union = self._empty
+        for posting in per_attribute:
+            union = self._or(union, posting)
+        if len(self._word_cache) >= WORD_CACHE_SIZE:
+            self._word_cache.clear()
+        self._word_cache[key] = (union, per_attribute)
+        return union, per_attribute
+
+    # --- search ---
+
+    def search(self, query="", facetFilters=None, numericFilters=None,
+               hitsPerPage=None, page=0, attributesToRetrieve=None, **_):
+        start = time.perf_counter()
+        hits_per_page = self.hits_per_page if hitsPerPage is None else hitsPerPage
+        candidates = self._and(
+            self._filter_groups(facetFilters, self._facet),
+            self._filter_groups(numericFilters, self._numeric),
+        )
+
+        words = tokenize(query or "")
+        matched = []
+        for i, word in enumerate(words):
+            union, per_attribute = self._word(word, prefix=i == len(words) - 1)
+            candidates = self._and(candidates, union)
+            matched.append(per_attribute)
+
+        nb_hits = self._count(candidates)
+        skip = page * hits_per_page
+        if not words:
+            docs = self._take(candidates, skip, hits_per_page)
+        else:
+            # Attribute criterion: a doc ranks by the first searchable
+            # attribute any query word matched in, then by customRanking.
+            docs = []
+            remaining = candidates
+            for pos in range(len(self.searchable)):
+                if len(docs) >= hits_per_page:
+                    break
+                in_attribute = self._empty
+                for per_attribute in matched:
+                    in_attribute = self._or(in_attribute, per_attribute[pos])
+                if not len(in_attribute):
+                    continue
+                tier = self._and(remaining, in_attribute)
+                if skip:
+                    tier_size = self._count(tier)
+                    if skip >= tier_size:
+                        skip -= tier_size
+                        remaining = self._andnot(remaining, tier)
+                        continue
+                docs.extend(self._take(tier, skip, hits_per_page - len(docs)))
+                skip = 0
+                remaining = self._andnot(remaining, tier)
+
+        retrieve = attributesToRetrieve or self.retrieve
+        return {
+            "hits": [self._hit(self.records[d], retrieve) for d in docs],
+            "nbHits": nb_hits,
+            "page": page,
+            "nbPages": -(-nb_hits // hits_per_page) if hits_per_page else 0,
+            "hitsPerPage": hits_per_page,
+            "query": query or "",
+            "processingTimeMS": int((time.perf_counter() - start) * 1000),
+        }
+
+    @staticmethod
+    def _hit(record, retrieve):
+        if not retrieve or "*" in retrieve:
+            return dict(record)
+        hit = {"objectID": record.get("objectID")}
+        for attr in retrieve:
+            if attr in record:
+                hit[attr] = record[attr]
+        return hit
+
+
+def multi_search(indexes, requests):
+    """Answer a searchClient.search({requests}) payload; `indexes` maps names to LocalIndex."""
+    results = []
+    for request in requests:
+        params = {k: v for k, v in request.items() if k != "indexName"}
+        result = indexes[request["indexName"]].search(**params)
+        result["index"] = request["indexName"]
+        results.append(result)
+    return {"results": results}
+
+
+if __name__ == "__main__":
+    from sinks import iter_catalog
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="items.json or NDJSON produced by generate_dataset.py")
+    parser.add_argument("query", nargs="?", default="")
+    parser.add_argument("--facet", action="append", default=[],
+                        help="facet filter; comma-separate values to OR them (category:gear,category:supplement)")
+    parser.add_argument("--numeric", action="append", default=[], help="numeric filter, e.g. price_range_usd<=50")
+    parser.add_argument("--hits", type=int, default=10)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = LocalIndex(list(iter_catalog(args.path)))
+    print(f"Indexed {index.n} records in {time.perf_counter() - t0:.2f}s")
+
+    t0 = time.perf_counter()
+    result = index.search(args.query, [f.split(",") for f in args.facet], args.numeric, args.hits)
+    elapsed_us = (time.perf_counter() - t0) * 1e6
+    print(f"{result['nbHits']} hits in {elapsed_us:.0f}us")
+    for hit in result["hits"]:
+        print(f"  {hit['rating']:.1f}  {hit['category']:<10}  {hit['name']}  (${hit['price_range_usd']})")
@@ -0,0 +1,223 @@
+"""Lightweight per-stage instrumentation for the dataset pipeline.
+
+A Metrics registry collects:
+
+  * stages: wall time, calls, records and bytes per named stage
+    (generate, builder.exercise, json_write, upload_batch, set_settings...),
+  * counters: plain event counts (retries, failed batches),
+  * histograms: fixed-bucket latency distributions (upload batch latency).
+
+It is thread-safe, so upload worker threads can report into it. The
+snapshot is written as JSON and as a Prometheus text-format file.
+"""
+
+import cProfile
+import contextlib
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+
+PREFIX = "healthforge"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, out = 0, []
+        for le, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += n
+            out.append((le, total))
+        return out
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for le, total in self.cumulative():
+            if total >= target:
+                return le if le != "+Inf" else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, seconds, records=0, nbytes=0, calls=1):
+        with self.lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "records": 0, "bytes": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += calls
+            stage["records"] += records
+            stage["bytes"] += nbytes
+
+    @contextlib.contextmanager
+    def stage(self, name, records=0, nbytes=0):
+        """Time a block; the yielded dict's records/bytes may be filled in by the block."""
+        sizes = {"records": records, "bytes": nbytes}
+        start = time.perf_counter()
+        try:
+            yield sizes
+        finally:
+            self.add_stage(name, time.perf_counter() - start, sizes["records"], sizes["bytes"])
+
+    def iterate(self, name, records):
+        """Yield from `records`, adding only the time spent producing them to stage `name`."""
+        seconds, n = 0.0, 0
+        records = iter(records)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    record = next(records)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                n += 1
+                yield record
+        finally:
+            self.add_stage(name, seconds, n)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def merge_stages(self, stages):
+        # Stage totals reported back by worker processes.
+        for name, s in stages.items():
+            self.add_stage(name, s["seconds"], s["records"], s["bytes"], s["calls"])
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for name, s in self.stages.items():
+                seconds = s["seconds"]
+                stages[name] = dict(
+                    s,
+                    seconds=round(seconds, 6),
+                    records_per_s=round(s["records"] / seconds, 1) if seconds else 0.0,
+                    bytes_per_s=round(s["bytes"] / seconds, 1) if seconds else 0.0,
+                )
+            histograms = {
+                name: {
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50": h.quantile(0.5),
+                    "p99": h.quantile(0.99),
+                    "buckets": [[le, n] for le, n in h.cumulative()],
+                }
+                for name, h in self.histograms.items()
+            }
+            return {
+                "started": self.started,
+                "wall_s": round(time.time() - self.started, 6),
+                "stages": stages,
+                "counters": dict(self.counters),
+                "histograms": histograms,
+            }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def write_prometheus(self, path):
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {PREFIX}_run_duration_seconds Wall time of the whole run.",
+            f"# TYPE {PREFIX}_run_duration_seconds gauge",
+            f"{PREFIX}_run_duration_seconds {snap['wall_s']}",
+        ]
+        for field, help_text in (("seconds", "Wall time spent in the stage."),
+                                 ("calls", "Times the stage ran."),
+                                 ("records", "Records handled by the stage."),
+                                 ("bytes", "Bytes handled by the stage.")):
+            name = f"{PREFIX}_stage_{field}_total"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{stage="{stage}"}} {s[field]}' for stage, s in sorted(snap["stages"].items())]
+        for counter, value in sorted(snap["counters"].items()):
+            name = f"{PREFIX}_{counter}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        for histogram, h in sorted(snap["histograms"].items()):
+            name = f"{PREFIX}_{histogram}"
+            lines.append(f"# TYPE {name} histogram")
+            lines += [f'{name}_bucket{{le="{le}"}} {n}' for le, n in h["buckets"]]
+            lines += [f"{name}_sum {h['sum']}", f"{name}_count {h['count']}"]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # Atomic, so a node_exporter textfile collector never reads half a file.
+        os.replace(tmp, path)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(q * len(sorted_values) / 100)))
+    return sorted_values[rank - 1]
+
+
+def timed(fn, stages, name):
+    """Wrap `fn` so every call adds its wall time to stages[name] (a plain dict, picklable)."""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        stage = stages.get(name)
+        if stage is None:
+            stage = stages[name] = {"seconds": 0.0, "calls": 0, "records": 0, "bytes": 0}
+        stage["seconds"] += time.perf_counter() - start
+        stage["calls"] += 1
+        stage["records"] += 1
+        return result
+    return wrapper
+
+
+@contextlib.contextmanager
+def profiled(path, top=15, log=print):
+    """cProfile the block and dump pstats to `path`; a no-op when path is None."""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        if log is not None:
+            log(f"  Profile saved to {path}; top functions by cumulative time:")
+            # stderr, so the table never mixes into records streamed to stdout.
+            stats = pstats.Stats(profiler, stream=sys.stderr)
+            stats.sort_stats("cumulative").print_stats(top)
@@ -0,0 +1,325 @@
+"""Record sinks: every destination a catalog can stream into.
+
+A sink takes records one at a time with write() and finishes with close(),
+which returns a summary dict. fan_out() drives several sinks from a single
+pass over a record iterator, so a catalog is generated once no matter how
+many destinations it goes to. Backends are imported when their sink is
+built, never when this module loads: numpy only for the columnar, kit-cache
+and local-index sinks, the HTTP uploader only for the remote index.
+
+Sinks selectable with --out SPEC:
+
+    ndjson:PATH    compact NDJSON, one record per line
+    json:PATH      pretty-printed JSON array (the classic items.json)
+    stdout, -      NDJSON on standard output
+    columnar:PATH  binary catalog (see columnar.py)
+    kits:PATH      kit_cache SQLite store for the hot profile space
+
+RemoteIndexSink (upload / sync) and LocalIndexSink are built by the
+generate_dataset.py commands that need them; the remote sink is handed the
+upload or sync function, so this module never imports the CLI.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+QUEUE_SIZE = 10_000
+
+
+class Sink:
+    name = "sink"
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        return {}
+
+
+class NdjsonSink(Sink):
+    name = "ndjson"
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._file = open(path, "w")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n")
+        self.records += 1
+
+    def close(self):
+        self._file.close()
+        return {"records": self.records, "bytes": os.path.getsize(self.path), "path": self.path}
+
+
+class StdoutSink(Sink):
+    name = "stdout"
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        self.stream.write(line)
+        self.records += 1
+        self.bytes += len(line)
+
+    def close(self):
+        self.stream.flush()
+        return {"records": self.records, "bytes": self.bytes}
+
+
+class JsonArraySink(Sink):
+    """Streams the same bytes json.dump(records, f, indent=2) would write."""
+
+    name = "json"
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._file = open(path, "w")
+
+    def write(self, record):
+        # JSON escapes newlines inside strings, so every "\n" here is layout.
+        self._file.write("[\n  " if not self.records else ",\n  ")
+        self._file.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+        self.records += 1
+
+    def close(self):
+        self._file.write("\n]" if self.records else "[]")
+        self._file.close()
+        return {"records": self.records, "bytes": os.path.getsize(self.path), "path": self.path}
+
+
+class ColumnarSink(Sink):
+    name = "columnar"
+
+    def __init__(self, path):
+        from columnar import ColumnarWriter
+
+        self.path = path
+        self._writer = ColumnarWriter(path)
+
+    def write(self, record):
+        self._writer.write(record)
+
+    def close(self):
+        n = self._writer.close()
+        return {"records": n, "bytes": os.path.getsize(self.path), "path": self.path}
+
+
+class CollectingSink(Sink):
+    # For backends that need the whole catalog before they can do anything.
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+class KitCacheSink(CollectingSink):
+    name = "kits"
+
+    def __init__(self, path, log=print):
+        super().__init__()
+        self.path = path
+        self.log = log
+
+    def close(self):
+        import kit_cache
+        from kit_builder import KitCatalog
+
+        catalog = KitCatalog(self.records)
+        kits = kit_cache.materialize(catalog, self.path, kit_cache.hot_profiles(catalog), log=self.log)
+        return {"records": len(self.records), "kits": kits, "bytes": os.path.getsize(self.path), "path": self.path}
+
+
+class LocalIndexSink(CollectingSink):
+    """Builds a local_search.LocalIndex; available as .index after close()."""
+
+    name = "local"
+
+    def __init__(self, settings=None):
+        super().__init__()
+        self.settings = settings
+        self.index = None
+
+    def close(self):
+        from local_search import LocalIndex
+
+        self.index = LocalIndex(self.records, self.settings)
+        return {"records": self.index.n}
+
+
+class CheckSink(Sink):
+    """Streaming structural checks: duplicate objectIDs, missing or mistyped attributes."""
+
+    name = "check"
+    REQUIRED = {
+        "objectID": str, "name": str, "category": str, "subcategory": str, "description": str,
+        "rating": (int, float), "price_range_usd": (int, float), "indoor": bool,
+        "goals": list, "allergens": list, "equipment": list, "weather_suitability": list,
+    }
+
+    def __init__(self, max_examples=20):
+        self.max_examples = max_examples
+        self.records = 0
+        self.categories = {}
+        self.problems = 0
+        self.examples = []
+        self._seen = set()
+
+    def _problem(self, message):
+        self.problems += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append(message)
+
+    def write(self, record):
+        self.records += 1
+        oid = record.get("objectID")
+        if oid in self._seen:
+            self._problem(f"duplicate objectID {oid!r}")
+        self._seen.add(oid)
+        for attr, kind in self.REQUIRED.items():
+            value = record.get(attr)
+            if not isinstance(value, kind) or (kind == (int, float) and isinstance(value, bool)):
+                self._problem(f"{oid}: {attr} is {value!r}")
+        rating = record.get("rating")
+        if isinstance(rating, (int, float)) and not 0 <= rating <= 5:
+            self._problem(f"{oid}: rating {rating} outside 0-5")
+        category = record.get("category")
+        self.categories[category] = self.categories.get(category, 0) + 1
+
+    def close(self):
+        return {"records": self.records, "categories": self.categories,
+                "problems": self.problems, "examples": self.examples}
+
+
+_DONE = object()
+
+
+class ThreadedSink(Sink):
+    """Feeds a pull-based consumer (it takes an iterable) running on its own thread.
+
+    The bounded queue gives backpressure: a slow consumer slows the
+    producer instead of buffering the whole catalog.
+    """
+
+    def __init__(self, consume):
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(consume,), daemon=True)
+        self._thread.start()
+
+    def _run(self, consume):
+        try:
+            self._result = consume(iter(self._queue.get, _DONE))
+        except BaseException as e:  # re-raised in the producer thread
+            self._error = e
+
+    def write(self, record):
+        while True:
+            try:
+                self._queue.put(record, timeout=0.5)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    raise self._error or RuntimeError(f"{self.name} sink stopped early")
+
+    def close(self):
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_DONE, timeout=0.5)
+                break
+            except queue.Full:
+                pass
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class RemoteIndexSink(ThreadedSink):
+    """Streams records into `send` (upload_to_algolia or sync_to_algolia, bound to a target)."""
+
+    def __init__(self, send, name="upload"):
+        self.name = name
+        super().__init__(send)
+
+
+def open_sink(spec, log=print):
+    kind, _, path = spec.partition(":")
+    if spec in ("-", "stdout"):
+        return StdoutSink()
+    if not path:
+        raise ValueError(f"sink {spec!r} needs a path, e.g. {kind}:/tmp/items.{kind}")
+    if kind == "ndjson":
+        return NdjsonSink(path)
+    if kind == "json":
+        return JsonArraySink(path)
+    if kind == "columnar":
+        return ColumnarSink(path)
+    if kind == "kits":
+        return KitCacheSink(path, log)
+    raise ValueError(f"unknown sink {kind!r} (expected ndjson, json, stdout, columnar or kits)")
+
+
+def fan_out(records, sinks, metrics=None):
+    """Write every record to every sink in one pass; returns ({sink: summary}, count).
+
+    With a metrics.Metrics registry, each sink's write and close time is
+    reported as a sink.<name> stage.
+    """
+    elapsed = [0.0] * len(sinks)
+    n = 0
+    if metrics is None:
+        for record in records:
+            for sink in sinks:
+                sink.write(record)
+            n += 1
+    else:
+        clock = time.perf_counter
+        for record in records:
+            for i, sink in enumerate(sinks):
+                start = clock()
+                sink.write(record)
+                elapsed[i] += clock() - start
+            n += 1
+
+    summaries = {}
+    for i, sink in enumerate(sinks):
+        start = time.perf_counter()
+        summary = sink.close() or {}
+        if metrics is not None:
+            metrics.add_stage(f"sink.{sink.name}", elapsed[i] + time.perf_counter() - start,
+                              summary.get("records", 0), summary.get("bytes", 0))
+        summaries[sink] = summary
+    return summaries, n
+
+
+def iter_catalog(path):
+    """Stream records from items.json, NDJSON or a columnar file."""
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(b"HFCOL"):  # columnar.MAGIC, without importing numpy for other formats
+        from columnar import ColumnarCatalog
+
+        with ColumnarCatalog(path) as catalog:
+            yield from catalog.records()
+        return
+    with open(path) as f:
+        if head.lstrip().startswith(b"["):
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import algolia_standin  # noqa: E402
+import bulk_upload  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    """Factory for stand-in servers; every server is shut down after the test."""
+    servers = []
+
+    def start(fail_rate=0.0):
+        server, url = algolia_standin.serve(fail_rate=fail_rate)
+        servers.append(server)
+        return server, url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(bulk_upload, "BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(bulk_upload, "BACKOFF_CAP", 0.01)
+
+
+@pytest.fixture
+def settings_unavailable(monkeypatch):
+    """Make every stand-in answer PUT .../settings with 503."""
+    handle = algolia_standin.StandinHandler._handle
+
+    def refuse_settings(self, method):
+        if method == "PUT" and self.path.split("?", 1)[0].endswith("/settings"):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            return self._reply(503, {"message": "settings unavailable", "status": 503})
+        return handle(self, method)
+
+    monkeypatch.setattr(algolia_standin.StandinHandler, "_handle", refuse_settings)
@@ -0,0 +1,99 @@
+import http.server
+import threading
+
+import pytest
+
+import bulk_upload
+import generate_dataset
+from index_config import INDEX_NAME, INDEX_SETTINGS
+
+
+def records(n):
+    return [{"objectID": f"r{i}", "name": f"record {i}", "rating": i % 5} for i in range(n)]
+
+
+def test_iter_batches_respects_byte_budget():
+    entries = [bulk_upload.encode_request(r) for r in records(50)]
+    batches = list(bulk_upload.iter_batches(entries, max_bytes=500))
+    assert [e for b in batches for e in b] == entries
+    assert all(sum(len(e) + 1 for e in b) <= 500 for b in batches)
+
+
+def test_oversized_entry_is_sent_alone():
+    entries = [b"x" * 10, b"y" * 1000, b"z" * 10]
+    assert list(bulk_upload.iter_batches(entries, max_bytes=100)) == [[b"x" * 10], [b"y" * 1000], [b"z" * 10]]
+
+
+def test_upload_to_standin(standin):
+    server, url = standin()
+    transport = bulk_upload.Transport(url, "app", "key")
+    stats = bulk_upload.bulk_upload(transport, "ix", records(300), max_batch_bytes=2000, concurrency=3, log=None)
+    assert stats["records"] == 300 and stats["failed_batches"] == 0
+    assert stats["batches"] > 3
+    assert server.state.indexes["ix"] == {r["objectID"]: r for r in records(300)}
+
+
+def test_retries_ride_out_injected_failures(standin):
+    server, url = standin(fail_rate=0.3)
+    transport = bulk_upload.Transport(url, "app", "key")
+    stats = bulk_upload.bulk_upload(transport, "ix", records(200), max_batch_bytes=1000, retries=20, log=None)
+    assert stats["failed_batches"] == 0
+    assert stats["retries"] == server.state.failures > 0
+    assert len(server.state.indexes["ix"]) == 200
+
+
+def test_failed_batches_are_reported(standin):
+    _, url = standin(fail_rate=1.0)
+    transport = bulk_upload.Transport(url, "app", "key")
+    stats = bulk_upload.bulk_upload(transport, "ix", records(100), max_batch_bytes=1000, retries=1, log=None)
+    assert stats["records"] == 0
+    assert stats["failed_records"] == 100
+    assert stats["failed_batches"] == len(stats["errors"]) == stats["batches"]
+
+
+def test_non_json_success_fails_only_that_batch():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Length", "5")
+            self.end_headers()
+            self.wfile.write(b"<html")
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        transport = bulk_upload.Transport(f"http://127.0.0.1:{server.server_address[1]}", "app", "key")
+        with pytest.raises(bulk_upload.UploadError):
+            transport.request("POST", "/1/indexes/ix/batch", b"{}")
+        stats = bulk_upload.bulk_upload(transport, "ix", records(10), log=None)
+        assert stats["failed_batches"] == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_upload_to_algolia_sets_settings(standin):
+    server, url = standin()
+    stats = generate_dataset.upload_to_algolia(records(20), host=url, log=lambda msg: None)
+    assert stats["records"] == 20
+    assert server.state.settings[INDEX_NAME] == INDEX_SETTINGS
+
+
+def test_upload_command_fails_when_batches_fail(standin):
+    server, url = standin(fail_rate=1.0)
+    argv = ["upload", "--host", url, "--count", "200", "--seed", "1", "--batch-bytes", "20000"]
+    assert generate_dataset.main(argv) == 1
+    assert INDEX_NAME not in server.state.settings
+
+
+def test_upload_command_fails_when_settings_fail(standin, settings_unavailable, capsys):
+    server, url = standin()
+    argv = ["upload", "--host", url, "--count", "200", "--seed", "1"]
+    assert generate_dataset.main(argv) == 1
+    out = capsys.readouterr().out
+    assert "! settings:" in out and "could not be configured" in out and "Done!" not in out
+    assert len(server.state.indexes[INDEX_NAME]) == 200
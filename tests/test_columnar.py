@@ -0,0 +1,62 @@
+import json
+
+import columnar
+import generate_dataset
+from sinks import iter_catalog
+
+
+def roundtrip(records, path):
+    assert columnar.write_columnar(records, path) == len(records)
+    with columnar.ColumnarCatalog(path) as catalog:
+        assert len(catalog) == len(records)
+        return catalog.records(), [catalog.record(i) for i in range(len(records))]
+
+
+def test_generated_catalog_roundtrips_exactly(tmp_path):
+    items = generate_dataset.generate_all_items(count=2000, seed=9)
+    path = str(tmp_path / "items.hfc")
+    records, one_by_one = roundtrip(items, path)
+    assert records == items and one_by_one == items
+    # Key order survives too, so re-serialized JSON is byte-identical.
+    assert [json.dumps(r) for r in records] == [json.dumps(r) for r in items]
+    assert columnar.is_columnar(path)
+    assert list(iter_catalog(path)) == items
+
+
+def test_mixed_and_missing_values_roundtrip(tmp_path):
+    records = [
+        {"objectID": "a", "n": 1, "tags": ["x", "y"], "extra": None},
+        {"objectID": "b", "n": 2.5, "tags": [], "nested": {"k": [1, 2]}},
+        {"tags": ["z"], "objectID": "c", "n": True, "flag": False},
+        {"objectID": "d", "n": "text"},
+    ]
+    decoded, one_by_one = roundtrip(records, str(tmp_path / "mixed.hfc"))
+    assert decoded == records and one_by_one == records
+    assert [list(r) for r in decoded] == [list(r) for r in records]
+    # True == 1 in Python, so compare types as well.
+    assert [type(r["n"]) for r in decoded] == [int, float, bool, str]
+
+
+def test_large_ints_stay_exact(tmp_path):
+    records = [
+        {"n": 2 ** 60 + 1, "big": 1},
+        {"n": 1.5, "big": 2 ** 64},
+        {"n": 3, "big": -2 ** 70},
+    ]
+    decoded, one_by_one = roundtrip(records, str(tmp_path / "big.hfc"))
+    assert decoded == records and one_by_one == records
+    assert [type(r["n"]) for r in decoded] == [int, float, int]
+    decoded, _ = roundtrip([{"n": 2 ** 64}], str(tmp_path / "huge.hfc"))
+    assert decoded == [{"n": 2 ** 64}]
+
+
+def test_strings_past_the_dictionary_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "DICT_LIMIT", 16)
+    records = [{"objectID": f"id-{i}", "kind": "same" if i % 2 else "other"} for i in range(100)]
+    decoded, _ = roundtrip(records, str(tmp_path / "wide.hfc"))
+    assert decoded == records
+
+
+def test_empty_catalog(tmp_path):
+    decoded, _ = roundtrip([], str(tmp_path / "empty.hfc"))
+    assert decoded == []
@@ -0,0 +1,38 @@
+import json
+
+import dedup
+import generate_dataset
+
+
+def record(oid, name="Trail Runner", **extra):
+    return {"objectID": oid, "name": name, "category": "gear", "description": "light and fast", **extra}
+
+
+def test_colliding_ids_are_rekeyed_deterministically():
+    records = [record("a1"), record("a1", name="Rain Shell"), record("b2", name="Headlamp")]
+    first = list(dedup.Deduplicator(near=False).filter(records))
+    second = list(dedup.Deduplicator(near=False).filter(records))
+    assert first == second
+    assert len({r["objectID"] for r in first}) == 3
+    assert first[1]["objectID"] == dedup.rekey("a1", 1)
+
+
+def test_near_mode_drops_repeats_and_counts_them():
+    deduper = dedup.Deduplicator(near=True)
+    records = [record("a"), record("b"), record("c", rating=4), record("d", name="Rain Shell")]
+    kept = list(deduper.filter(records))
+    assert [r["objectID"] for r in kept] == ["a", "d"]
+    assert deduper.stats["exact_duplicates"] == 2 and deduper.stats["kept"] == 2
+
+
+def test_generate_keeps_count_by_default(tmp_path):
+    path = tmp_path / "items.ndjson"
+    assert generate_dataset.main(["generate", "--count", "500", "--seed", "3", "--out", f"ndjson:{path}"]) in (None, 0)
+    assert len(path.read_text().splitlines()) == 500
+
+
+def test_verify_from_sees_duplicate_ids(tmp_path):
+    path = tmp_path / "items.ndjson"
+    path.write_text("".join(json.dumps(r) + "\n" for r in [record("a1"), record("a1", name="Rain Shell")]))
+    # verify must check the file as written, not a re-keyed copy of it.
+    assert generate_dataset.main(["verify", "--from", str(path)]) == 1
@@ -0,0 +1,105 @@
+import pytest
+
+import bulk_upload
+import delta_sync
+
+SETTINGS = {"searchableAttributes": ["name"]}
+
+
+def catalog():
+    return [{"objectID": f"o{i}", "name": f"item {i}", "rating": 4.0, "tags": ["a", "b"]} for i in range(50)]
+
+
+def run(url, records, manifest, index="ix", settings=SETTINGS):
+    transport = bulk_upload.Transport(url, "app", "key")
+    return delta_sync.sync(transport, index, records, settings, manifest, log=None, max_batch_bytes=2000)
+
+
+def test_first_sync_adds_everything(standin, tmp_path):
+    server, url = standin()
+    stats = run(url, catalog(), str(tmp_path / "m.sqlite"))
+    assert (stats["added"], stats["unchanged"], stats["settings_updated"], stats["manifest_saved"]) == (50, 0, True, True)
+    assert server.state.indexes["ix"] == {r["objectID"]: r for r in catalog()}
+
+
+def test_diff_actions(standin, tmp_path):
+    server, url = standin()
+    manifest = str(tmp_path / "m.sqlite")
+    run(url, catalog(), manifest)
+
+    records = catalog()[:-5]
+    records[0]["rating"] = 1.5  # same attributes: partial update
+    del records[1]["tags"]  # attribute set changed: full replace
+    records.append({"objectID": "new", "name": "fresh"})
+    stats = run(url, records, manifest)
+
+    assert {k: stats[k] for k in ("added", "updated", "replaced", "deleted", "unchanged")} == {
+        "added": 1, "updated": 1, "replaced": 1, "deleted": 5, "unchanged": 43,
+    }
+    assert not stats["settings_updated"]
+    assert server.state.indexes["ix"] == {r["objectID"]: r for r in records}
+
+    again = run(url, records, manifest)
+    assert again["unchanged"] == len(records) and again["batches"] == 0
+
+
+def test_partial_update_sends_only_changed_attributes(tmp_path):
+    manifest = str(tmp_path / "m.sqlite")
+    writer = delta_sync.ManifestWriter(manifest, "t")
+    list(delta_sync.iter_changes(catalog(), delta_sync.Manifest(manifest, "t"), writer, _counts()))
+    writer.commit(None)
+
+    records = catalog()
+    records[3]["rating"] = 2.0
+    old = delta_sync.Manifest(manifest, "t")
+    ops = list(delta_sync.iter_changes(records, old, delta_sync.ManifestWriter(manifest, "t"), _counts()))
+    assert ops == [("partialUpdateObject", {"rating": 2.0, "objectID": "o3"})]
+    old.close()
+
+
+def _counts():
+    return {"added": 0, "updated": 0, "replaced": 0, "deleted": 0, "unchanged": 0}
+
+
+def test_failed_sync_keeps_previous_manifest(standin, tmp_path):
+    server, url = standin()
+    manifest = str(tmp_path / "m.sqlite")
+    run(url, catalog(), manifest)
+
+    records = catalog()
+    records[0]["rating"] = 0.5
+    server.state.fail_rate = 1.0
+    transport = bulk_upload.Transport(url, "app", "key")
+    stats = delta_sync.sync(transport, "ix", records, SETTINGS, manifest, log=None, retries=0)
+    assert stats["failed_batches"] and not stats["manifest_saved"]
+    assert not (tmp_path / "m.sqlite.tmp").exists()
+
+    # The old manifest still stands, so the change is resent once the index recovers.
+    server.state.fail_rate = 0.0
+    stats = run(url, records, manifest)
+    assert (stats["updated"], stats["unchanged"], stats["manifest_saved"]) == (1, 49, True)
+    assert server.state.indexes["ix"]["o0"]["rating"] == 0.5
+
+
+def test_manifest_is_bound_to_host_and_index(standin, tmp_path):
+    _, url = standin()
+    manifest = str(tmp_path / "m.sqlite")
+    run(url, catalog(), manifest)
+    with pytest.raises(delta_sync.ManifestError, match="tracks"):
+        run(url, catalog(), manifest, index="other")
+
+
+def test_catalog_hash_ignores_order():
+    records = catalog()
+    assert delta_sync.catalog_hash(records) == delta_sync.catalog_hash(records[::-1])
+    records[0]["rating"] = 3.0
+    assert delta_sync.catalog_hash(records) != delta_sync.catalog_hash(catalog())
+
+
+def test_failed_settings_keep_the_old_manifest(standin, settings_unavailable, tmp_path):
+    server, url = standin()
+    manifest = str(tmp_path / "m.sqlite")
+    stats = run(url, catalog(), manifest)
+    assert stats["settings_failed"] and not stats["manifest_saved"]
+    assert stats["errors"] and not (tmp_path / "m.sqlite").exists()
+    assert "settings update failed" in delta_sync.format_counts(stats)
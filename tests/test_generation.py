@@ -0,0 +1,50 @@
+import pytest
+
+import generate_dataset
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    # Several variation shards without generating a huge catalog. Shard
+    # bounds are planned in the parent, so workers need no patching.
+    monkeypatch.setattr(generate_dataset, "SHARD_SIZE", 200)
+
+
+def test_output_does_not_depend_on_workers():
+    serial = generate_dataset.generate_all_items(count=1000, seed=7, workers=1)
+    parallel = generate_dataset.generate_all_items(count=1000, seed=7, workers=3)
+    assert serial == parallel
+
+
+def test_sharded_ndjson_is_byte_identical(tmp_path):
+    expected = tmp_path / "serial.ndjson"
+    generate_dataset.write_ndjson(generate_dataset.iter_all_items(count=1000, seed=7), str(expected))
+    for workers in (1, 2):
+        path = tmp_path / f"w{workers}.ndjson"
+        assert generate_dataset.write_ndjson_sharded(str(path), count=1000, seed=7, workers=workers) == 1000
+        assert path.read_bytes() == expected.read_bytes()
+
+
+def test_count_is_a_target_and_ids_are_unique():
+    items = generate_dataset.generate_all_items(count=1234, seed=1)
+    assert len(items) == 1234
+    assert len({r["objectID"] for r in items}) == 1234
+
+
+def test_seed_controls_content():
+    assert generate_dataset.generate_all_items(count=300, seed=1) == generate_dataset.generate_all_items(count=300, seed=1)
+    assert generate_dataset.generate_all_items(count=300, seed=1) != generate_dataset.generate_all_items(count=300, seed=2)
+
+
+def test_fixed_catalog_is_stable_across_sizes():
+    base = generate_dataset.generate_all_items(scale=0, seed=3)
+    assert len(base) == generate_dataset.base_item_count()
+    for count in (200, 900):
+        items = {r["objectID"]: r for r in generate_dataset.generate_all_items(count=count, seed=3)}
+        assert all(items[r["objectID"]] == r for r in base)
+
+
+def test_gear_records_share_one_shape():
+    items = generate_dataset.generate_all_items(scale=0)
+    shapes = {tuple(r) for r in items if r["category"] == "gear"}
+    assert len(shapes) == 1 and "provides_equipment" in shapes.pop()
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+import generate_dataset
+from index_config import INDEX_NAME
+from kit_builder import KitCatalog, assemble_kit, build_kit, random_profile
+from local_search import LocalIndex, multi_search
+
+
+@pytest.fixture(scope="module")
+def items():
+    return generate_dataset.generate_all_items(count=3000, seed=5)
+
+
+def local_kits(records, profiles):
+    indexes = {INDEX_NAME: LocalIndex(records)}
+    return [build_kit(lambda requests: multi_search(indexes, requests), p) for p in profiles]
+
+
+def test_vectorized_kits_match_build_kit(items):
+    rng = random.Random(11)
+    profiles = [random_profile(rng) for _ in range(300)]
+    assert KitCatalog(items).build_kits(profiles) == local_kits(items, profiles)
+
+
+def test_profile_without_goals_gets_empty_kit(items):
+    profile = dict(random_profile(random.Random(0)), goals=[])
+    assert KitCatalog(items).build_kits([profile]) == [{"items": [], "alerts": []}]
+    assert local_kits(items, [profile]) == [{"items": [], "alerts": []}]
+
+
+def test_equipment_gap_ignores_case_and_whitespace(items):
+    profile = random_profile(random.Random(0))
+    exercise = {"category": "exercise", "name": "Swings", "equipment": ["Kettlebell ", "kettlebell", "Pool Access"]}
+    gear = {"category": "gear", "name": "Bell", "provides_equipment": ["kettlebell"]}
+    kit = assemble_kit(profile, [[exercise], [], [gear], []])
+    assert kit["alerts"] == ['Your exercises need "Pool Access" — consider adding matching gear to your kit']
+
+
+def test_engines_agree_on_unnormalized_equipment(items):
+    messy = [dict(r, equipment=[f" {e.upper()}" for e in r["equipment"]]) if r["category"] == "exercise" else r
+             for r in items]
+    rng = random.Random(3)
+    profiles = [random_profile(rng) for _ in range(200)]
+    kits = local_kits(messy, profiles)
+    assert KitCatalog(messy).build_kits(profiles) == kits
+    clean = local_kits(items, profiles)
+    assert [len(k["alerts"]) for k in kits] == [len(k["alerts"]) for k in clean]
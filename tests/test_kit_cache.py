@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+import generate_dataset
+import kit_cache
+from kit_builder import KitCatalog, random_profile
+from kit_cache import KitCache, hot_profiles, materialize
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return KitCatalog(generate_dataset.generate_all_items(count=3000, seed=5))
+
+
+def profiles(n, seed=11):
+    rng = random.Random(seed)
+    return [random_profile(rng) for _ in range(n)]
+
+
+def test_cached_kits_match_computed_kits(catalog):
+    cache = KitCache(catalog)
+    uncarried = next(a for a in kit_cache.PROFILE_ALLERGIES if a not in catalog.allergen_vocab)
+    for profile in profiles(200):
+        variants = [
+            profile,
+            dict(profile, goals=list(reversed(profile["goals"]))),
+            dict(profile, allergies=profile["allergies"] + [uncarried]),
+        ]
+        for variant in variants:
+            assert cache.get(variant) == catalog.build_kits([variant])[0]
+    assert cache.hits["lru"] > 0
+
+
+def test_store_serves_the_same_kits(catalog, tmp_path):
+    store = str(tmp_path / "kits.sqlite")
+    hot = list(hot_profiles(catalog, max_goals=1, max_allergies=0))
+    assert materialize(catalog, store, hot, log=None) == len(hot)
+    cache = KitCache(catalog, store)
+    assert cache.store_active
+    for profile in random.Random(2).sample(hot, 300):
+        assert cache.get(profile) == catalog.build_kits([profile])[0]
+    assert cache.hits["store"] == 300 and cache.hits["computed"] == 0
+
+
+def test_changed_catalog_drops_lru_and_store(catalog, tmp_path):
+    store = str(tmp_path / "kits.sqlite")
+    hot = list(hot_profiles(catalog, max_goals=1, max_allergies=0))
+    materialize(catalog, store, hot, log=None)
+    cache = KitCache(catalog, store)
+    cache.get(hot[0])
+
+    # Same content: nothing is dropped.
+    cache.load_catalog(KitCatalog(list(catalog.records)))
+    assert cache.store_active and len(cache._lru) == 1
+
+    changed = KitCatalog([dict(r, rating=1.0) if i == 0 else r for i, r in enumerate(catalog.records)])
+    cache.load_catalog(changed)
+    assert not cache.store_active and len(cache._lru) == 0
+    assert cache.get(hot[0]) == changed.build_kits([hot[0]])[0]
+    assert cache.hits["computed"] == 1
+
+
+def test_lru_is_bounded(catalog):
+    cache = KitCache(catalog, lru_size=8)
+    for profile in profiles(100, seed=4):
+        cache.get(profile)
+        assert len(cache._lru) <= 8
+    assert len(cache._lru) == 8
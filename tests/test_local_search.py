@@ -0,0 +1,153 @@
+import operator
+import random
+
+import pytest
+
+import generate_dataset
+import local_search
+from local_search import LocalIndex, as_list, facet_value, tokenize
+
+OPS = {"<": operator.lt, "<=": operator.le, "=": operator.eq, "!=": operator.ne, ">=": operator.ge, ">": operator.gt}
+SEARCHABLE = ["name", "category", "subcategory", "description", "goals", "muscle_groups", "benefits",
+              "compatibility_tags", "diet_type"]
+TOKENS = {}  # objectID -> per-attribute token sets, for the brute-force reference
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return generate_dataset.generate_all_items(count=600, seed=5)
+
+
+# --- brute force reference ---
+
+def facet_matches(record, spec):
+    attr, _, value = spec.partition(":")
+    negate = value.startswith("-")
+    found = value.lstrip("-").lower() in {facet_value(v) for v in as_list(record.get(attr))}
+    return found != negate
+
+
+def numeric_matches(record, spec):
+    m = local_search.RANGE_RE.match(spec)
+    if m:
+        value = record.get(m.group(1))
+        return local_search.is_number(value) and float(m.group(2)) <= value <= float(m.group(3))
+    attr, op, bound = local_search.NUMERIC_RE.match(spec).groups()
+    value = record.get(attr)
+    return local_search.is_number(value) and OPS[op](value, float(bound))
+
+
+def groups_match(record, filters, matches):
+    return all(any(matches(record, spec) for spec in as_list(group)) for group in filters or [])
+
+
+def record_tokens(record):
+    key = record["objectID"]
+    if key not in TOKENS:
+        TOKENS[key] = [{t for v in as_list(record.get(attr)) for t in tokenize(v)} for attr in SEARCHABLE]
+    return TOKENS[key]
+
+
+def first_attribute(record, words):
+    # Position of the first searchable attribute any query word matched in,
+    # or None when some word matches nowhere.
+    if not words:
+        return 0
+    tokens = record_tokens(record)
+    positions = []
+    for i, word in enumerate(words):
+        prefix = i == len(words) - 1
+        hits = [pos for pos, ts in enumerate(tokens) if any(t == word or (prefix and t.startswith(word)) for t in ts)]
+        if not hits:
+            return None
+        positions.append(hits[0])
+    return min(positions)
+
+
+def brute_force(records, query="", facet_filters=None, numeric_filters=None):
+    ranked = sorted(records, key=lambda r: r.get("rating") or 0, reverse=True)
+    words = tokenize(query)
+    matched = []
+    for record in ranked:
+        if not groups_match(record, facet_filters, facet_matches):
+            continue
+        if not groups_match(record, numeric_filters, numeric_matches):
+            continue
+        pos = first_attribute(record, words)
+        if pos is not None:
+            matched.append((pos, record))
+    # sorted() is stable, so ties keep customRanking order.
+    return [r["objectID"] for _, r in sorted(matched, key=lambda m: m[0])]
+
+
+def random_request(rng, records):
+    record = rng.choice(records)
+    facets = []
+    for attr in rng.sample(["category", "goals", "difficulty", "allergens", "indoor", "weather_suitability",
+                            "equipment", "diet_type"], rng.randint(0, 3)):
+        values = sorted({facet_value(v) for r in rng.sample(records, 3) for v in as_list(r.get(attr))})
+        values = values or ["none"]
+        group = [f"{attr}:{'-' if rng.random() < 0.25 else ''}{v}" for v in rng.sample(values, min(2, len(values)))]
+        facets.append(group if len(group) > 1 or rng.random() < 0.5 else group[0])
+    numerics = []
+    for _ in range(rng.randint(0, 2)):
+        attr = rng.choice(["rating", "price_range_usd"])
+        bound = record.get(attr) or 0
+        if rng.random() < 0.3:
+            numerics.append(f"{attr}:{bound} TO {bound + rng.choice([0, 0.5, 40])}")
+        else:
+            spec = f"{attr}{rng.choice(list(OPS))}{bound}"
+            numerics.append([spec, f"rating>={rng.choice([4.5, 4.8])}"] if rng.random() < 0.2 else spec)
+    words = tokenize(record.get("name", "")) + rng.choice([[], tokenize(" ".join(as_list(record.get("goals"))))])
+    query = " ".join(rng.sample(words, min(len(words), rng.randint(0, 2))))
+    if query and rng.random() < 0.5:
+        query = query[:-1]  # exercise the prefix match on the last word
+    return query, facets, numerics
+
+
+@pytest.mark.parametrize("levels", [local_search.MAX_NUMERIC_LEVELS, 1])
+def test_search_matches_brute_force(catalog, monkeypatch, levels):
+    # levels=1 forces the column-scan path for numeric filters.
+    monkeypatch.setattr(local_search, "MAX_NUMERIC_LEVELS", levels)
+    index = LocalIndex(catalog)
+    rng = random.Random(11)
+    for _ in range(300):
+        query, facets, numerics = random_request(rng, catalog)
+        expected = brute_force(catalog, query, facets, numerics)
+        result = index.search(query, facets, numerics, hitsPerPage=len(catalog))
+        assert [h["objectID"] for h in result["hits"]] == expected, (query, facets, numerics)
+        assert result["nbHits"] == len(expected)
+
+
+def test_filter_semantics(catalog):
+    index = LocalIndex(catalog)
+
+    def ids(*args, **kwargs):
+        return [h["objectID"] for h in index.search(*args, hitsPerPage=len(catalog), **kwargs)["hits"]]
+
+    gear_or_meal = ids(facetFilters=[["category:gear", "category:meal_plan"]])
+    assert gear_or_meal == brute_force(catalog, facet_filters=[["category:gear", "category:meal_plan"]])
+    assert {r["category"] for r in catalog if r["objectID"] in gear_or_meal} == {"gear", "meal_plan"}
+    # Top-level entries AND, and a leading '-' negates a facet.
+    assert ids(facetFilters=["category:exercise", "indoor:-true"]) == \
+        brute_force(catalog, facet_filters=["category:exercise", "indoor:-true"])
+    assert all(r["indoor"] is not True for r in catalog
+               if r["objectID"] in ids(facetFilters=["indoor:-true"]))
+    for spec in ["price_range_usd<50", "price_range_usd<=50", "rating!=4.5", "rating:4 TO 4.5", "rating>4.7"]:
+        assert ids(numericFilters=[spec]) == brute_force(catalog, numeric_filters=[spec]), spec
+
+
+def test_hits_follow_desc_rating_and_page(catalog):
+    index = LocalIndex(catalog)
+    every = [h["objectID"] for h in index.search("", hitsPerPage=len(catalog))["hits"]]
+    ratings = [r["rating"] for r in sorted(catalog, key=lambda r: every.index(r["objectID"]))]
+    assert ratings == sorted(ratings, reverse=True)
+    assert every == brute_force(catalog)
+
+    for query, facets in [("", ["category:exercise"]), ("strength", None), ("yoga fl", None)]:
+        expected = brute_force(catalog, query, facets)
+        first = index.search(query, facets, hitsPerPage=7)
+        assert first["nbHits"] == len(expected) and first["nbPages"] == -(-len(expected) // 7)
+        pages = [index.search(query, facets, hitsPerPage=7, page=p)["hits"] for p in range(first["nbPages"] + 1)]
+        assert [h["objectID"] for page in pages for h in page] == expected
+        assert pages[-1] == []
@@ -0,0 +1,18 @@
+from metrics import Metrics, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile(values, 99) == 10
+    assert percentile(values, 0) == 1
+    assert percentile(list(range(1, 101)), 70) == 70
+    assert percentile([], 50) == 0.0
+
+
+def test_iterate_times_the_producer_only():
+    metrics = Metrics()
+    assert list(metrics.iterate("generate", range(5))) == [0, 1, 2, 3, 4]
+    assert metrics.stages["generate"]["records"] == 5 and metrics.stages["generate"]["calls"] == 1
+